@@ -0,0 +1,50 @@
+"""Add delta sync tracking
+
+Revision ID: b4c1d2e3f4a5
+Revises: 79d88ee38b9d
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4c1d2e3f4a5'
+down_revision = '79d88ee38b9d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('item', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+    op.add_column('notice', sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+    # Existing rules never had updated_at maintained
+    op.execute('UPDATE rule SET updated_at = COALESCE(updated_at, created_at, now())')
+
+    op.create_index('ix_item_owner_id_updated_at', 'item', ['owner_id', 'updated_at'])
+    op.create_index('ix_notice_user_id_updated_at', 'notice', ['user_id', 'updated_at'])
+    op.create_index('ix_rule_updated_at', 'rule', ['updated_at'])
+
+    op.create_table('deleted_record',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('table_name', sqlmodel.sql.sqltypes.AutoString(length=50), nullable=False),
+        sa.Column('record_id', sa.UUID(), nullable=False),
+        sa.Column('owner_id', sa.UUID(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_deleted_record_table_owner_deleted_at', 'deleted_record', ['table_name', 'owner_id', 'deleted_at'])
+    op.create_index('ix_deleted_record_table_deleted_at', 'deleted_record', ['table_name', 'deleted_at'])
+
+
+def downgrade():
+    op.drop_index('ix_deleted_record_table_deleted_at', table_name='deleted_record')
+    op.drop_index('ix_deleted_record_table_owner_deleted_at', table_name='deleted_record')
+    op.drop_table('deleted_record')
+    op.drop_index('ix_rule_updated_at', table_name='rule')
+    op.drop_index('ix_notice_user_id_updated_at', table_name='notice')
+    op.drop_index('ix_item_owner_id_updated_at', table_name='item')
+    op.drop_column('notice', 'updated_at')
+    op.drop_column('item', 'updated_at')
@@ -0,0 +1,39 @@
+"""Add user deletion job
+
+Revision ID: c7e2a9d41b08
+Revises: b4c1d2e3f4a5
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a9d41b08'
+down_revision = 'b4c1d2e3f4a5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_deletion_job',
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column('items_deleted', sa.Integer(), nullable=False),
+        sa.Column('notices_deleted', sa.Integer(), nullable=False),
+        sa.Column('rules_deleted', sa.Integer(), nullable=False),
+        sa.Column('error', sqlmodel.sql.sqltypes.AutoString(length=500), nullable=True),
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Chunked deletes look up a user's rules by owner
+    op.create_index(op.f('ix_rule_owner_id'), 'rule', ['owner_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_rule_owner_id'), table_name='rule')
+    op.drop_table('user_deletion_job')
@@ -1,47 +1,142 @@
-from collections.abc import Generator
+import hashlib
+import secrets
+from collections.abc import Callable, Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
-from app.models import TokenPayload, User
+from app.core.db import engine, read_engine, recent_writers, set_statement_timeout
+from app.core.revocation import token_revocations
+from app.core.timing import current_timings, phase
+from app.models import (
+    ItemPublic,
+    NoticePublic,
+    RulePublic,
+    TokenPayload,
+    User,
+    UserPublic,
+)
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
 
-def get_db() -> Generator[Session, None, None]:
+READ_METHODS = {"GET", "HEAD"}
+
+
+def client_key(request: Request) -> str | None:
+    """
+    Digest of the request's credentials, identifying a client for
+    read-your-writes routing without keeping the token around.
+    """
+    authorization = request.headers.get("authorization")
+    if not authorization:
+        return None
+    return hashlib.blake2b(authorization.encode(), digest_size=16).hexdigest()
+
+
+def get_db(request: Request) -> Generator[Session, None, None]:
+    # Write sub-requests of /batch share the batch's session
+    session = getattr(request.state, "db_session", None)
+    if session is not None:
+        yield session
+        return
+    key = client_key(request)
+    if request.method in READ_METHODS:
+        # Reads go to a replica unless this client wrote recently
+        bind = engine if key and recent_writers.is_recent(key) else read_engine()
+        with Session(bind) as session:
+            yield session
+        return
     with Session(engine) as session:
+        if key:
+            session.info["client_key"] = key
         yield session
 
 
+@event.listens_for(Session, "after_commit")
+def _mark_recent_writer(session: Session) -> None:
+    # Only a commit makes the client a recent writer: a /batch of reads, or a
+    # POST that only reads, keeps the client's reads on the replicas
+    key = session.info.get("client_key")
+    if key:
+        recent_writers.mark(key)
+
+
 SessionDep = Annotated[Session, Depends(get_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+def statement_timeout(milliseconds: int) -> Callable[[Session], None]:
+    """
+    Route dependency replacing ``POSTGRES_STATEMENT_TIMEOUT_MS`` for the
+    statements of the request's session. List it in the route's
+    ``dependencies`` so it runs before the session's first query; otherwise
+    it costs an extra ``SET LOCAL`` round trip.
+    """
+
+    def set_timeout(session: SessionDep) -> None:
+        set_statement_timeout(session, milliseconds)
+
+    return set_timeout
+
+
+verified_tokens = security.VerifiedTokenCache(settings.VERIFIED_TOKEN_CACHE_SIZE)
+
+
+def decode_token(token: str) -> TokenPayload:
+    # Clients send the same token on every request until it expires
+    token_data: TokenPayload | None = verified_tokens.get(token)
+    if token_data is not None:
+        return token_data
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
         token_data = TokenPayload(**payload)
     except (Exception, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, token_data.sub)
+    if token_data.exp is not None:
+        verified_tokens.put(token, token_data, token_data.exp)
+    return token_data
+
+
+def get_current_user(request: Request, session: SessionDep, token: TokenDep) -> User:
+    # Sub-requests of /batch reuse the user the batch authenticated
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+    with phase("auth"):
+        token_data = decode_token(token)
+        if token_data.jti and token_revocations.is_revoked(token_data.jti):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Token has been revoked"
+            )
+    with phase("user"):
+        user = session.get(User, token_data.sub)
+    timings = current_timings()
+    if timings is not None and user is not None:
+        timings.superuser = user.is_superuser
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    # All of the user's tokens from before e.g. a password change are revoked
+    if user.tokens_valid_after and (
+        token_data.iat is None or token_data.iat < user.tokens_valid_after.timestamp()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Token has been revoked"
+        )
     return user
 
 
@@ -54,3 +149,51 @@ def get_current_active_superuser(current_user: CurrentUser) -> User:
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+def get_metrics_reader(request: Request, session: SessionDep, token: TokenDep) -> None:
+    """
+    Let a scraper presenting ``METRICS_TOKEN`` through without touching the
+    database; anyone else has to be a superuser.
+    """
+    if settings.METRICS_TOKEN and secrets.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    ):
+        return
+    get_current_active_superuser(get_current_user(request, session, token))
+
+
+def sparse_fields(public_model: type[SQLModel]) -> Callable[..., tuple[str, ...]]:
+    """
+    Dependency parsing a ``fields=a,b`` query parameter into the requested
+    subset of ``public_model``'s fields, in schema order. ``id`` is always
+    included; without the parameter all fields are returned.
+    """
+    all_fields = tuple(public_model.model_fields)
+
+    def get_fields(
+        fields: str | None = Query(
+            None,
+            description="Comma-separated list of fields to return",
+            examples=["id,full_name,avatar"],
+        ),
+    ) -> tuple[str, ...]:
+        if not fields:
+            return all_fields
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested.difference(all_fields)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+            )
+        requested.add("id")
+        return tuple(field for field in all_fields if field in requested)
+
+    return get_fields
+
+
+UserFields = Annotated[tuple[str, ...], Depends(sparse_fields(UserPublic))]
+ItemFields = Annotated[tuple[str, ...], Depends(sparse_fields(ItemPublic))]
+NoticeFields = Annotated[tuple[str, ...], Depends(sparse_fields(NoticePublic))]
+RuleFields = Annotated[tuple[str, ...], Depends(sparse_fields(RulePublic))]
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, private, users, utils, notices, rules, analytics
+from app.api.routes import items, login, private, users, utils, notices, rules, analytics, batch
 from app.core.config import settings
 
 api_router = APIRouter()
@@ -11,6 +11,7 @@ api_router.include_router(items.router)
 api_router.include_router(notices.router)
 api_router.include_router(rules.router)
 api_router.include_router(analytics.router)
+api_router.include_router(batch.router)
 
 
 if settings.ENVIRONMENT == "local":
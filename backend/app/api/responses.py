@@ -0,0 +1,117 @@
+import hashlib
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import Row
+from sqlmodel import SQLModel
+
+
+def public_columns(
+    model: type[SQLModel],
+    public_model: type[SQLModel],
+    fields: Sequence[str] | None = None,
+) -> list[Any]:
+    """
+    Columns of ``model`` backing the fields of ``public_model`` (or the sparse
+    fieldset ``fields``), in field order.
+
+    Selecting these instead of the entity returns plain ``Row`` tuples: no
+    identity map entries, no attribute instrumentation, and columns such as
+    ``hashed_password`` are never read.
+    """
+    return [getattr(model, field) for field in fields or public_model.model_fields]
+
+
+def public_dicts(
+    rows: Iterable[Any],
+    public_model: type[SQLModel],
+    fields: Sequence[str] | None = None,
+    trailing: int = 0,
+) -> list[dict[str, Any]]:
+    """
+    Pick the fields of ``public_model`` (or ``fields``) off trusted ORM
+    objects, or zip them with rows selected through ``public_columns``, without
+    running pydantic validation. orjson encodes the UUID and datetime values
+    natively.
+
+    Rows may carry ``trailing`` extra columns (e.g. an owner id for a
+    permission check), which are dropped; any other mismatch between the row
+    and the fields is a bug and raises.
+    """
+    fields = tuple(fields or public_model.model_fields)
+    return [
+        dict(zip(fields, row[: len(row) - trailing], strict=True))
+        if isinstance(row, Row)
+        else {field: getattr(row, field) for field in fields}
+        for row in rows
+    ]
+
+
+def page_response(
+    rows: Iterable[Any],
+    public_model: type[SQLModel],
+    count: int,
+    fields: Sequence[str] | None = None,
+    **extra: Any,
+) -> ORJSONResponse:
+    """
+    Fast path for list endpoints returning ``{"data": [...], "count": n}``.
+
+    Returning a ``Response`` makes FastAPI skip its second validation against
+    the route's ``response_model``; the model is still declared on the route so
+    the OpenAPI schema does not change.
+    """
+    return ORJSONResponse(
+        {"data": public_dicts(rows, public_model, fields), "count": count, **extra}
+    )
+
+
+def object_response(
+    row: Any,
+    public_model: type[SQLModel],
+    fields: Sequence[str] | None = None,
+    etag: str | None = None,
+    trailing: int = 0,
+) -> ORJSONResponse:
+    headers = cache_headers(etag) if etag else None
+    data = public_dicts([row], public_model, fields, trailing)[0]
+    return ORJSONResponse(data, headers=headers)
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    ETag from the parts that identify one version of a representation, e.g.
+    the row id, its ``updated_at`` and the requested sparse fieldset.
+
+    The tag is weak: ``CompressionMiddleware`` re-encodes the body per
+    ``Accept-Encoding``, and a strong tag would promise byte-identical
+    gzip, brotli and identity bodies.
+    """
+    digest = hashlib.blake2b(
+        "\x1f".join(map(str, parts)).encode(), digest_size=16
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether the request's ``If-None-Match`` header matches ``etag``, using the
+    weak comparison RFC 9110 requires for GETs: ``W/`` prefixes are ignored.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def cache_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private"}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlmodel import Session, select
 from typing import Any
 from datetime import datetime, timedelta
 import random
 
+import orjson
+
 from app.api.deps import SessionDep
+from app.core.compression import PrecompressedCache
+from app.core.config import settings
 
 router = APIRouter(tags=["analytics"])
 
+# Analytics snapshots are cached encoded and precompressed, so repeated hits
+# within ANALYTICS_CACHE_SECONDS skip both generation and compression
+analytics_cache = PrecompressedCache(
+    ttl=settings.ANALYTICS_CACHE_SECONDS, level=settings.COMPRESSION_LEVEL
+)
+
+
+def _analytics_snapshot() -> bytes:
+    return orjson.dumps({"data": generate_fake_analytics_data()})
+
 
 def generate_fake_analytics_data() -> dict[str, Any]:
     """
@@ -143,23 +157,21 @@ def generate_fake_analytics_data() -> dict[str, Any]:
     }
 
 
-@router.get("/fake_analysis_chart_data")
-def get_fake_analysis_chart_data() -> dict[str, Any]:
+@router.get("/fake_analysis_chart_data", response_model=dict[str, Any])
+def get_fake_analysis_chart_data(request: Request) -> Response:
     """
     Get fake analysis chart data for dashboard.
     """
-    data = generate_fake_analytics_data()
-    return {"data": data}
+    return analytics_cache.response(request, "analysis", _analytics_snapshot)
 
 
-@router.get("/chart_data")
-def get_chart_data() -> dict[str, Any]:
+@router.get("/chart_data", response_model=dict[str, Any])
+def get_chart_data(request: Request) -> Response:
     """
     Get chart data for workplace.
     """
     # Generate similar data for workplace
-    data = generate_fake_analytics_data()
-    return {"data": data}
+    return analytics_cache.response(request, "chart", _analytics_snapshot)
 
 
 @router.get("/activities")
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from typing import Any
+from urllib.parse import urlsplit
+
+import orjson
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlmodel import Session
+from starlette.types import Message as ASGIMessage
+
+from app.api.deps import CurrentUser, SessionDep
+from app.core.config import settings
+from app.models import (
+    BatchRequest,
+    BatchResponse,
+    BatchSubRequest,
+    BatchSubResponse,
+    User,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["batch"])
+
+# Headers of the outer request that sub-requests do not inherit
+_REQUEST_ONLY_HEADERS = {b"content-length", b"content-type", b"accept-encoding"}
+
+
+async def _dispatch(
+    request: Request,
+    sub: BatchSubRequest,
+    user: User,
+    session: Session | None,
+) -> BatchSubResponse:
+    """
+    Run one sub-request through the application's router, bypassing the
+    middleware stack, and collect its response.
+
+    ``user`` is handed to ``get_current_user`` through the request state so
+    the token is not decoded and the user not loaded again. ``session`` is
+    handed to ``get_db`` for writes; reads get their own session, which only
+    checks out a connection if the route queries the database.
+    """
+    url = urlsplit(sub.path)
+    path = f"{settings.API_V1_STR}/{url.path.lstrip('/')}"
+    body = b"" if sub.body is None else orjson.dumps(sub.body)
+    headers = [
+        (name, value)
+        for name, value in request.scope["headers"]
+        if name not in _REQUEST_ONLY_HEADERS
+    ]
+    if sub.body is not None:
+        headers += [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+    state = {**request.scope.get("state", {}), "user": user}
+    if session is not None:
+        state["db_session"] = session
+    scope = {
+        **request.scope,
+        "method": sub.method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "state": state,
+    }
+    # Drop what the outer request's routing left behind
+    for key in ("route", "endpoint", "path_params"):
+        scope.pop(key, None)
+
+    sent = False
+
+    async def receive() -> ASGIMessage:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status = 500
+    response_headers: dict[str, str] = {}
+    chunks: list[bytes] = []
+
+    async def send(message: ASGIMessage) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update(
+                (name.decode("latin-1"), value.decode("latin-1"))
+                for name, value in message["headers"]
+                if name != b"content-length"
+            )
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app.router(scope, receive, send)
+    except Exception:
+        logger.exception("Batch sub-request %s %s failed", sub.method, sub.path)
+        if session is not None:
+            await run_in_threadpool(session.rollback)
+        return BatchSubResponse(status=500, body="Internal Server Error")
+    content = b"".join(chunks)
+    data: Any = None
+    if content:
+        if response_headers.get("content-type", "").startswith("application/json"):
+            data = orjson.loads(content)
+        else:
+            data = content.decode(errors="replace")
+    return BatchSubResponse(status=status, headers=response_headers, body=data)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def batch(
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    batch_in: BatchRequest,
+) -> Any:
+    """
+    Run several API calls in one HTTP request.
+
+    Sub-requests share the batch's authentication. Consecutive GETs run
+    concurrently; every other method runs on its own, in order, on one shared
+    session, so a GET after a write sees the write. Each sub-request gets its
+    own status, headers and body, and a failing one does not stop the others.
+    """
+    if len(batch_in.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BATCH_MAX_REQUESTS} requests per batch",
+        )
+    for sub in batch_in.requests:
+        if urlsplit(sub.path).path.strip("/").startswith("batch"):
+            raise HTTPException(status_code=400, detail="Batches cannot be nested")
+
+    responses: list[BatchSubResponse] = []
+    reads: list[BatchSubRequest] = []
+
+    async def run_reads() -> None:
+        responses.extend(
+            await asyncio.gather(
+                *(_dispatch(request, sub, current_user, None) for sub in reads)
+            )
+        )
+        reads.clear()
+
+    for sub in batch_in.requests:
+        if sub.method == "GET":
+            reads.append(sub)
+            continue
+        await run_reads()
+        responses.append(await _dispatch(request, sub, current_user, session))
+        # The write may have committed (expiring the user) or changed the user;
+        # reload it here rather than from the concurrent reads that follow
+        await run_in_threadpool(session.refresh, current_user)
+    await run_reads()
+    return ORJSONResponse(
+        {"responses": [response.model_dump() for response in responses]}
+    )
@@ -1,27 +1,99 @@
+import csv
+import json
 import uuid
-from typing import Any
+from collections.abc import AsyncIterator
+from datetime import datetime
+from typing import Any, Literal
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlmodel import func, select
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Item, ItemCreate, ItemPublic, ItemsPublic, ItemUpdate, Message
+from app import crud
+from app.api.deps import CurrentUser, ItemFields, SessionDep
+from app.api.responses import (
+    etag_matches,
+    make_etag,
+    not_modified,
+    object_response,
+    page_response,
+    public_columns,
+)
+from app.core.config import settings
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemImportError,
+    ItemPublic,
+    ItemsChanges,
+    ItemsImported,
+    ItemsPublic,
+    ItemUpdate,
+    Message,
+)
+from app.utils import ExportFormat, export_response
 
 router = APIRouter(prefix="/items", tags=["items"])
 
 
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes | None]:
+    """
+    Split a byte stream into lines. A line longer than
+    ``ITEM_IMPORT_MAX_LINE_BYTES`` is not buffered: it is skipped up to its
+    newline and yielded as None.
+    """
+    limit = settings.ITEM_IMPORT_MAX_LINE_BYTES
+    buffer = b""
+    skipping = False
+    async for chunk in stream:
+        if skipping:
+            end = chunk.find(b"\n")
+            if end < 0:
+                continue
+            skipping = False
+            yield None
+            chunk = chunk[end + 1 :]
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield None if len(line) > limit else line
+        if len(buffer) > limit:
+            buffer = b""
+            skipping = True
+    if skipping:
+        yield None
+    elif buffer:
+        yield None if len(buffer) > limit else buffer
+
+
+def _import_error_detail(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(loc) for loc in e['loc']) or 'line'}: {e['msg']}"
+            for e in error.errors()
+        )
+    return str(error)
+
+
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    fields: ItemFields,
+    skip: int = 0,
+    limit: int = 100,
 ) -> Any:
     """
     Retrieve items.
     """
 
+    columns = public_columns(Item, ItemPublic, fields)
     if current_user.is_superuser:
         count_statement = select(func.count()).select_from(Item)
         count = session.exec(count_statement).one()
-        statement = select(Item).offset(skip).limit(limit)
+        statement = select(*columns).offset(skip).limit(limit)
         items = session.exec(statement).all()
     else:
         count_statement = (
@@ -31,27 +103,154 @@ def read_items(
         )
         count = session.exec(count_statement).one()
         statement = (
-            select(Item)
+            select(*columns)
             .where(Item.owner_id == current_user.id)
             .offset(skip)
             .limit(limit)
         )
         items = session.exec(statement).all()
 
-    return ItemsPublic(data=items, count=count)
+    return page_response(items, ItemPublic, count, fields)
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_items(
+    current_user: CurrentUser, format: ExportFormat = "ndjson"
+) -> StreamingResponse:
+    """
+    Stream all visible items as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and encoded as they arrive, so
+    memory use stays flat regardless of the number of items.
+    """
+    fields = list(ItemPublic.model_fields)
+    statement = select(*public_columns(Item, ItemPublic)).order_by(Item.id)
+    if not current_user.is_superuser:
+        statement = statement.where(Item.owner_id == current_user.id)
+    return export_response(statement, fields, format, filename="items")
+
+
+@router.post("/import", response_model=ItemsImported)
+async def import_items(
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    format: Literal["ndjson", "csv"] = "ndjson",
+) -> Any:
+    """
+    Bulk-create items from a streamed NDJSON or CSV upload.
+
+    The body is parsed line by line and loaded with ``COPY`` every
+    ``ITEM_IMPORT_CHUNK_SIZE`` valid rows, so memory use does not depend on the
+    size of the upload. Invalid lines are skipped and reported; CSV uploads need
+    a ``title,description`` header and one record per line, with as many
+    fields as the header.
+    """
+    imported = failed = 0
+    errors: list[ItemImportError] = []
+    chunk: list[ItemCreate] = []
+    header: list[str] | None = None
+    line_no = 0
+    async for line in _iter_lines(request.stream()):
+        line_no += 1
+        if line is not None and not line.strip():
+            continue
+        try:
+            if line is None:
+                raise ValueError(
+                    f"Line longer than {settings.ITEM_IMPORT_MAX_LINE_BYTES} bytes"
+                )
+            if format == "csv":
+                values = next(csv.reader([line.decode("utf-8-sig")]))
+                if header is None:
+                    header = values
+                    continue
+                if len(values) != len(header):
+                    raise ValueError(
+                        f"Expected {len(header)} fields, got {len(values)}"
+                    )
+                record: Any = {
+                    k: v or None for k, v in zip(header, values, strict=True)
+                }
+            else:
+                record = json.loads(line)
+            chunk.append(ItemCreate.model_validate(record))
+        except ValueError as e:
+            # Covers JSON, unicode and pydantic validation errors
+            failed += 1
+            if len(errors) < settings.ITEM_IMPORT_MAX_ERRORS:
+                errors.append(
+                    ItemImportError(line=line_no, detail=_import_error_detail(e))
+                )
+            continue
+        if len(chunk) >= settings.ITEM_IMPORT_CHUNK_SIZE:
+            imported += await run_in_threadpool(
+                crud.copy_items,
+                session=session,
+                items_in=chunk,
+                owner_id=current_user.id,
+            )
+            chunk = []
+    if chunk:
+        imported += await run_in_threadpool(
+            crud.copy_items, session=session, items_in=chunk, owner_id=current_user.id
+        )
+    return ItemsImported(imported=imported, failed=failed, errors=errors)
+
+
+@router.get("/changes", response_model=ItemsChanges)
+def read_item_changes(
+    session: SessionDep, current_user: CurrentUser, since: datetime
+) -> Any:
+    """
+    Items changed or deleted since the client's last high-water mark.
+    """
+    items, deleted, high_water_mark = crud.get_changes(
+        session=session,
+        model=Item,
+        owner_column=Item.owner_id,
+        since=since,
+        owner_id=None if current_user.is_superuser else current_user.id,
+    )
+    return ItemsChanges(data=items, deleted=deleted, high_water_mark=high_water_mark)
 
 
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+def read_item(
+    request: Request,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    fields: ItemFields,
+) -> Any:
     """
     Get item by ID.
+
+    The ETag is derived from ``updated_at``; a matching ``If-None-Match`` is
+    answered with 304 after reading only the version and owner columns.
     """
-    item = session.get(Item, id)
+    if request.headers.get("if-none-match"):
+        version = session.exec(
+            select(Item.owner_id, Item.updated_at).where(Item.id == id)
+        ).first()
+        if not version:
+            raise HTTPException(status_code=404, detail="Item not found")
+        if not current_user.is_superuser and (version[0] != current_user.id):
+            raise HTTPException(status_code=400, detail="Not enough permissions")
+        etag = make_etag(id, version[1], fields)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    statement = select(
+        *public_columns(Item, ItemPublic, fields), Item.owner_id, Item.updated_at
+    ).where(Item.id == id)
+    item = session.exec(statement).first()
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-    if not current_user.is_superuser and (item.owner_id != current_user.id):
+    # The owner and version are selected last, after the requested fields
+    if not current_user.is_superuser and (item[-2] != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    return item
+    etag = make_etag(id, item[-1], fields)
+    return object_response(item, ItemPublic, fields, etag=etag, trailing=2)
 
 
 @router.post("/", response_model=ItemPublic)
@@ -105,5 +304,11 @@ def delete_item(
     if not current_user.is_superuser and (item.owner_id != current_user.id):
         raise HTTPException(status_code=400, detail="Not enough permissions")
     session.delete(item)
+    crud.record_deletion(
+        session=session,
+        table_name=Item.__tablename__,
+        record_id=item.id,
+        owner_id=item.owner_id,
+    )
     session.commit()
     return Message(message="Item deleted successfully")
@@ -1,16 +1,32 @@
-from datetime import timedelta
+import uuid
+from datetime import datetime, timedelta
 from typing import Annotated, Any
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlmodel import Session
 
 from app import crud
-from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
+from app.api.deps import (
+    CurrentUser,
+    SessionDep,
+    TokenDep,
+    decode_token,
+    get_current_active_superuser,
+)
 from app.core import security
 from app.core.config import settings
+from app.core.revocation import token_revocations
 from app.core.security import get_password_hash
-from app.models import Message, NewPassword, Token, User, UserPublic
+from app.models import (
+    Message,
+    NewPassword,
+    Token,
+    TokenRefresh,
+    User,
+    UserPublic,
+)
 from app.utils import (
     generate_password_reset_token,
     generate_reset_password_email,
@@ -35,11 +51,40 @@ def login_access_token(
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+    return issue_tokens(session, user, family_id=uuid.uuid4())
+
+
+@router.post("/login/refresh-token")
+def refresh_access_token(session: SessionDep, body: TokenRefresh) -> Token:
+    """
+    Exchange a refresh token for a new access token and refresh token. Each
+    refresh token can be used once; using one again ends the login it came from
+    """
+    db_token = crud.use_refresh_token(session=session, token=body.refresh_token)
+    if not db_token:
+        raise HTTPException(status_code=400, detail="Invalid refresh token")
+    user = session.get(User, db_token.user_id)
+    if (
+        not user
+        or not user.is_active
+        # Issued before e.g. a password change
+        or (user.tokens_valid_after and db_token.created_at < user.tokens_valid_after)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid refresh token")
+    return issue_tokens(session, user, family_id=db_token.family_id)
+
+
+def issue_tokens(session: Session, user: User, family_id: uuid.UUID) -> Token:
+    refresh_token = crud.create_refresh_token(
+        session=session, user_id=user.id, family_id=family_id
+    )
+    session.commit()
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return Token(
         access_token=security.create_access_token(
-            user.id, expires_delta=access_token_expires
-        )
+            user.id, expires_delta=access_token_expires, session_id=str(family_id)
+        ),
+        refresh_token=refresh_token,
     )
 
 
@@ -51,6 +96,24 @@ def test_token(current_user: CurrentUser) -> Any:
     return current_user
 
 
+@router.post("/logout")
+def logout(session: SessionDep, _current_user: CurrentUser, token: TokenDep) -> Message:
+    """
+    Revoke the access token of this request, and the refresh token issued with it
+    """
+    token_data = decode_token(token)
+    if not token_data.jti or not token_data.exp:
+        raise HTTPException(
+            status_code=400, detail="This token cannot be revoked, it has no id"
+        )
+    if token_data.sid:
+        crud.revoke_refresh_tokens(session=session, family_id=uuid.UUID(token_data.sid))
+    token_revocations.revoke(
+        session, token_data.jti, datetime.fromtimestamp(token_data.exp)
+    )
+    return Message(message="Logged out")
+
+
 @router.post("/password-recovery/{email}")
 def recover_password(email: str, session: SessionDep) -> Message:
     """
@@ -93,6 +156,7 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         raise HTTPException(status_code=400, detail="Inactive user")
     hashed_password = get_password_hash(password=body.new_password)
     user.hashed_password = hashed_password
+    user.tokens_valid_after = datetime.now()
     session.add(user)
     session.commit()
     return Message(message="Password updated successfully")
@@ -1,8 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from datetime import datetime
+from typing import Any
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Notice, NoticeCreate, NoticePublic, NoticesPublic
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlmodel import Session, func, select
+
+from app import crud
+from app.api.deps import CurrentUser, NoticeFields, SessionDep
+from app.api.responses import (
+    etag_matches,
+    make_etag,
+    not_modified,
+    object_response,
+    page_response,
+    public_columns,
+)
+from app.models import (
+    Notice,
+    NoticeCreate,
+    NoticePublic,
+    NoticesChanges,
+    NoticesPublic,
+)
 
 router = APIRouter(tags=["notices"])
 
@@ -11,19 +29,27 @@ router = APIRouter(tags=["notices"])
 def read_notices(
     session: SessionDep,
     current_user: CurrentUser,
+    fields: NoticeFields,
     skip: int = 0,
     limit: int = 100,
-) -> NoticesPublic:
+) -> Any:
     """
     Retrieve notices for the current user.
     """
-    count_statement = select(Notice).where(Notice.user_id == current_user.id)
-    count = len(session.exec(count_statement).all())
+    count_statement = (
+        select(func.count()).select_from(Notice).where(Notice.user_id == current_user.id)
+    )
+    count = session.exec(count_statement).one()
     
-    statement = select(Notice).where(Notice.user_id == current_user.id).offset(skip).limit(limit)
+    statement = (
+        select(*public_columns(Notice, NoticePublic, fields))
+        .where(Notice.user_id == current_user.id)
+        .offset(skip)
+        .limit(limit)
+    )
     notices = session.exec(statement).all()
     
-    return NoticesPublic(data=notices, count=count)
+    return page_response(notices, NoticePublic, count, fields)
 
 
 @router.post("/notices", response_model=NoticePublic)
@@ -36,29 +62,68 @@ def create_notice(
     """
     Create new notice.
     """
-    notice = Notice.model_validate(notice_in.model_dump())
-    notice.user_id = current_user.id
+    notice = Notice.model_validate(notice_in, update={"user_id": current_user.id})
     session.add(notice)
     session.commit()
     session.refresh(notice)
     return notice
 
 
+@router.get("/notices/changes", response_model=NoticesChanges)
+def read_notice_changes(
+    session: SessionDep,
+    current_user: CurrentUser,
+    since: datetime,
+) -> NoticesChanges:
+    """
+    Notices changed or deleted since the client's last high-water mark.
+    """
+    notices, deleted, high_water_mark = crud.get_changes(
+        session=session,
+        model=Notice,
+        owner_column=Notice.user_id,
+        since=since,
+        owner_id=current_user.id,
+    )
+    return NoticesChanges(
+        data=notices, deleted=deleted, high_water_mark=high_water_mark
+    )
+
+
 @router.get("/notices/{notice_id}", response_model=NoticePublic)
 def read_notice(
+    request: Request,
     notice_id: str,
     session: SessionDep,
     current_user: CurrentUser,
-) -> NoticePublic:
+    fields: NoticeFields,
+) -> Any:
     """
     Get notice by ID.
     """
-    notice = session.get(Notice, notice_id)
+    # Conditional request: check the version before loading the notice
+    if request.headers.get("if-none-match"):
+        version = session.exec(
+            select(Notice.user_id, Notice.updated_at).where(Notice.id == notice_id)
+        ).first()
+        if not version:
+            raise HTTPException(status_code=404, detail="Notice not found")
+        if version[0] != current_user.id:
+            raise HTTPException(status_code=400, detail="Not enough permissions")
+        etag = make_etag(notice_id, version[1], fields)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    statement = select(
+        *public_columns(Notice, NoticePublic, fields), Notice.user_id, Notice.updated_at
+    ).where(Notice.id == notice_id)
+    notice = session.exec(statement).first()
     if not notice:
         raise HTTPException(status_code=404, detail="Notice not found")
-    if notice.user_id != current_user.id:
+    # The owner and version are selected last, after the requested fields
+    if notice[-2] != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
-    return notice
+    etag = make_etag(notice_id, notice[-1], fields)
+    return object_response(notice, NoticePublic, fields, etag=etag, trailing=2)
 
 
 @router.delete("/notices/{notice_id}")
@@ -77,5 +142,11 @@ def delete_notice(
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
     session.delete(notice)
+    crud.record_deletion(
+        session=session,
+        table_name=Notice.__tablename__,
+        record_id=notice.id,
+        owner_id=notice.user_id,
+    )
     session.commit()
     return {"message": "Notice deleted successfully"} 
\ No newline at end of file
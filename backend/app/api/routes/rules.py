@@ -1,28 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select, or_, and_
+import uuid
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlmodel import Session, func, select, or_, and_
 from typing import Any
 
-from app.api.deps import CurrentUser, SessionDep
-from app.models import Rule, RuleCreate, RulePublic, RulesPublic
+from app import crud
+from app.api.deps import CurrentUser, RuleFields, SessionDep, statement_timeout
+from app.api.responses import (
+    cache_headers,
+    etag_matches,
+    make_etag,
+    not_modified,
+    public_columns,
+    public_dicts,
+)
+from app.core.counters import rule_counters
+from app.models import (
+    Message,
+    Rule,
+    RuleCreate,
+    RulePublic,
+    RulesBatchUpdate,
+    RulesBatchUpdated,
+    RulesChanges,
+    RulesPublic,
+)
 
 router = APIRouter(tags=["rules"])
 
+# Free-text name searches and filters on a large tenant can scan many rows;
+# fail them quickly rather than hold a connection for the default timeout
+READ_RULES_STATEMENT_TIMEOUT_MS = 3_000
+
+
+def rule_public(rule: Rule) -> RulePublic:
+    """
+    Build the public representation of a rule, including counter increments
+    that are still buffered in this worker.
+    """
+    return RulePublic.model_validate(rule, update=rule_counters.merge(rule))
+
 
-@router.get("/rule", response_model=RulesPublic)
+@router.get(
+    "/rule",
+    response_model=RulesPublic,
+    dependencies=[Depends(statement_timeout(READ_RULES_STATEMENT_TIMEOUT_MS))],
+)
 def read_rules(
     session: SessionDep,
     current_user: CurrentUser,
+    fields: RuleFields,
     current: int = Query(1, ge=1),
     pageSize: int = Query(10, ge=1, le=100),
     name: str | None = Query(None),
     sorter: str | None = Query(None),
     filter: str | None = Query(None),
-) -> RulesPublic:
+) -> Any:
     """
     Retrieve rules with pagination, filtering, and sorting.
     """
-    # Base query
-    statement = select(Rule)
+    # Base query, selecting only the columns RulePublic needs
+    statement = select(*public_columns(Rule, RulePublic, fields))
     
     # Apply name filter if provided
     if name:
@@ -57,8 +97,10 @@ def read_rules(
             pass
     
     # Get total count
-    count_statement = statement
-    total_count = len(session.exec(count_statement).all())
+    count_statement = select(func.count()).select_from(
+        statement.order_by(None).subquery()
+    )
+    total_count = session.exec(count_statement).one()
     
     # Apply pagination
     skip = (current - 1) * pageSize
@@ -66,11 +108,10 @@ def read_rules(
     
     rules = session.exec(statement).all()
     
-    return RulesPublic(
-        data=rules,
-        count=total_count,
-        success=True
-    )
+    data = public_dicts(rules, RulePublic, fields)
+    for row in data:
+        rule_counters.apply_pending(row)
+    return ORJSONResponse({"data": data, "count": total_count, "success": True})
 
 
 @router.post("/rule")
@@ -120,6 +161,10 @@ def manage_rule(
             rule.name = request_data["name"]
         if "desc" in request_data:
             rule.desc = request_data["desc"]
+        if "status" in request_data:
+            rule.status = request_data["status"]
+        if "progress" in request_data:
+            rule.progress = request_data["progress"]
         
         session.add(rule)
         session.commit()
@@ -133,12 +178,20 @@ def manage_rule(
         if not isinstance(keys, list):
             keys = [keys]
         
+        # Load all the caller's rules to delete in one query
+        rules = session.exec(
+            select(Rule).where(Rule.id.in_(keys), Rule.owner_id == current_user.id)
+        ).all()
         deleted_count = 0
-        for key in keys:
-            rule = session.get(Rule, key)
-            if rule and rule.owner_id == current_user.id:
-                session.delete(rule)
-                deleted_count += 1
+        for rule in rules:
+            session.delete(rule)
+            crud.record_deletion(
+                session=session,
+                table_name=Rule.__tablename__,
+                record_id=rule.id,
+                owner_id=rule.owner_id,
+            )
+            deleted_count += 1
         
         session.commit()
         
@@ -155,19 +208,115 @@ def manage_rule(
         raise HTTPException(status_code=400, detail="Invalid method")
 
 
+@router.patch("/rule/batch", response_model=RulesBatchUpdated)
+def batch_update_rules(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    rules_in: RulesBatchUpdate,
+) -> RulesBatchUpdated:
+    """
+    Set status and/or progress on many rules at once.
+
+    Rules that don't exist or belong to another user are skipped.
+    """
+    updated = crud.batch_update_rules(
+        session=session, owner_id=current_user.id, rules_in=rules_in
+    )
+    return RulesBatchUpdated(
+        updated=updated, skipped=len(set(rules_in.ids)) - updated
+    )
+
+
+@router.get("/rule/changes", response_model=RulesChanges)
+def read_rule_changes(
+    session: SessionDep,
+    current_user: CurrentUser,
+    since: datetime,
+) -> RulesChanges:
+    """
+    Rules changed or deleted since the client's last high-water mark; only
+    superusers see every user's rules.
+    """
+    rules, deleted, high_water_mark = crud.get_changes(
+        session=session,
+        model=Rule,
+        owner_column=Rule.owner_id,
+        since=since,
+        owner_id=None if current_user.is_superuser else current_user.id,
+    )
+    return RulesChanges(
+        data=[rule_public(rule) for rule in rules],
+        deleted=deleted,
+        high_water_mark=high_water_mark,
+    )
+
+
+def rule_etag(
+    rule_id: uuid.UUID, updated_at: datetime, fields: tuple[str, ...]
+) -> str:
+    """
+    ETag of a rule version. Counter increments buffered in this worker change
+    the response without touching ``updated_at``, so they are part of it.
+    """
+    deltas = rule_counters.pending(rule_id)
+    return make_etag(rule_id, updated_at, fields, *deltas.values())
+
+
 @router.get("/rule/{rule_id}", response_model=RulePublic)
 def read_rule(
-    rule_id: str,
+    request: Request,
+    rule_id: uuid.UUID,
     session: SessionDep,
     current_user: CurrentUser,
-) -> RulePublic:
+    fields: RuleFields,
+) -> Any:
     """
     Get rule by ID.
     """
-    rule = session.get(Rule, rule_id)
+    # Conditional request: check the version before loading the rule
+    if request.headers.get("if-none-match"):
+        updated_at = session.exec(
+            select(Rule.updated_at).where(Rule.id == rule_id)
+        ).first()
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="Rule not found")
+        etag = rule_etag(rule_id, updated_at, fields)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    statement = select(*public_columns(Rule, RulePublic, fields), Rule.updated_at).where(
+        Rule.id == rule_id
+    )
+    rule = session.exec(statement).first()
     if not rule:
         raise HTTPException(status_code=404, detail="Rule not found")
-    return rule
+    data = public_dicts([rule], RulePublic, fields, trailing=1)[0]
+    rule_counters.apply_pending(data)
+    etag = rule_etag(rule_id, rule[-1], fields)
+    return ORJSONResponse(data, headers=cache_headers(etag))
+
+
+@router.post("/rule/{rule_id}/call", status_code=202)
+def record_rule_call(
+    rule_id: uuid.UUID,
+    session: SessionDep,
+    current_user: CurrentUser,
+    progress: int = Query(0, ge=0, le=100),
+) -> Message:
+    """
+    Record one invocation of a rule.
+
+    The increment is buffered and written in the background, so the new
+    ``call_no`` is visible through this worker immediately and through the
+    database within ``RULE_COUNTER_FLUSH_INTERVAL_SECONDS``.
+    """
+    owner_id = session.exec(select(Rule.owner_id).where(Rule.id == rule_id)).first()
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    if not current_user.is_superuser and owner_id != current_user.id:
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    rule_counters.increment(rule_id, call_no=1, progress=progress)
+    return Message(message="Rule call recorded")
 
 
  
\ No newline at end of file
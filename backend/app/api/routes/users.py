@@ -1,30 +1,51 @@
 import uuid
+from datetime import datetime
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import col, delete, func, select
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import func, select
 
-from app import crud
+from app import crud, jobs
 from app.api.deps import (
     CurrentUser,
     SessionDep,
+    UserFields,
     get_current_active_superuser,
 )
+from app.api.responses import (
+    etag_matches,
+    make_etag,
+    not_modified,
+    object_response,
+    page_response,
+    public_columns,
+)
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app.models import (
     Item,
     Message,
+    Notice,
+    Rule,
     UpdatePassword,
     User,
     UserCreate,
+    UserDeletionJob,
+    UserDeletionJobPublic,
+    UserDeletionScheduled,
     UserPublic,
     UserRegister,
     UsersPublic,
     UserUpdate,
     UserUpdateMe,
 )
-from app.utils import generate_new_account_email, send_email
+from app.utils import (
+    ExportFormat,
+    export_response,
+    generate_new_account_email,
+    send_email,
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -34,7 +55,9 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep, fields: UserFields, skip: int = 0, limit: int = 100
+) -> Any:
     """
     Retrieve users.
     """
@@ -42,10 +65,48 @@ def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
     count_statement = select(func.count()).select_from(User)
     count = session.exec(count_statement).one()
 
-    statement = select(User).offset(skip).limit(limit)
+    statement = (
+        select(*public_columns(User, UserPublic, fields)).offset(skip).limit(limit)
+    )
     users = session.exec(statement).all()
 
-    return UsersPublic(data=users, count=count)
+    return page_response(users, UserPublic, count, fields)
+
+
+@router.get(
+    "/export",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_class=StreamingResponse,
+)
+def export_users(format: ExportFormat = "ndjson") -> StreamingResponse:
+    """
+    Stream all users with their item, rule and notice counts as NDJSON or CSV.
+
+    Each table is aggregated once with ``GROUP BY`` and joined to the users,
+    and the result is read through a server-side cursor.
+    """
+    usage = [
+        ("item_count", Item.owner_id),
+        ("rule_count", Rule.owner_id),
+        ("notice_count", Notice.user_id),
+    ]
+    user_fields = list(UserPublic.model_fields)
+    columns = public_columns(User, UserPublic)
+    count_subqueries = []
+    for label, owner_column in usage:
+        counts = (
+            select(owner_column.label("user_id"), func.count().label("n"))
+            .group_by(owner_column)
+            .subquery()
+        )
+        columns.append(func.coalesce(counts.c.n, 0).label(label))
+        count_subqueries.append(counts)
+    statement = select(*columns)
+    for counts in count_subqueries:
+        statement = statement.outerjoin(counts, counts.c.user_id == User.id)
+    statement = statement.order_by(User.id)
+    fields = user_fields + [label for label, _ in usage]
+    return export_response(statement, fields, format, filename="users")
 
 
 @router.post(
@@ -111,39 +172,47 @@ def update_password_me(
         )
     hashed_password = get_password_hash(body.new_password)
     current_user.hashed_password = hashed_password
+    # Sign out every session, this one included
+    current_user.tokens_valid_after = datetime.now()
     session.add(current_user)
     session.commit()
     return Message(message="Password updated successfully")
 
 
 @router.get("/me", response_model=UserPublic)
-def read_user_me(current_user: CurrentUser) -> Any:
+def read_user_me(
+    request: Request, current_user: CurrentUser, fields: UserFields
+) -> Any:
     """
     Get current user.
+
+    Users have no row version, so the ETag hashes the returned field values;
+    the user is already loaded for authentication, so only serialisation is
+    saved on a match.
     """
-    return current_user
+    etag = make_etag(fields, *(getattr(current_user, field) for field in fields))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return object_response(current_user, UserPublic, fields, etag=etag)
 
 
-@router.delete("/me", response_model=Message)
-def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
+@router.delete("/me", response_model=UserDeletionScheduled, status_code=202)
+def delete_user_me(
+    session: SessionDep, current_user: CurrentUser, background_tasks: BackgroundTasks
+) -> Any:
     """
     Delete own user.
+
+    The account is deactivated immediately; its items, notices and rules are
+    deleted in the background.
     """
     if current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-
-    # Delete related items explicitly since we're not using SQLAlchemy's cascade
-    user_id = current_user.id
-
-    # Delete the user's items
-    items_statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(items_statement)  # type: ignore
-
-    session.delete(current_user)
-    session.commit()
-    return Message(message="User deleted successfully")
+    job = jobs.start_user_deletion(session=session, user=current_user)
+    background_tasks.add_task(jobs.run_user_deletion, job.id)
+    return UserDeletionScheduled(message="User deletion scheduled", job_id=job.id)
 
 
 @router.post("/signup", response_model=UserPublic)
@@ -164,20 +233,28 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
 
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user_by_id(
-    user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
+    user_id: uuid.UUID,
+    session: SessionDep,
+    current_user: CurrentUser,
+    fields: UserFields,
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = session.get(User, user_id)
-    if user == current_user:
-        return user
+    if user_id == current_user.id:
+        return object_response(current_user, UserPublic, fields)
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403,
             detail="The user doesn't have enough privileges",
         )
-    return user
+    statement = select(*public_columns(User, UserPublic, fields)).where(
+        User.id == user_id
+    )
+    user = session.exec(statement).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return object_response(user, UserPublic, fields)
 
 
 @router.patch(
@@ -212,12 +289,24 @@ def update_user(
     return db_user
 
 
-@router.delete("/{user_id}", dependencies=[Depends(get_current_active_superuser)])
+@router.delete(
+    "/{user_id}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UserDeletionScheduled,
+    status_code=202,
+)
 def delete_user(
-    session: SessionDep, current_user: CurrentUser, user_id: uuid.UUID
-) -> Message:
+    session: SessionDep,
+    current_user: CurrentUser,
+    user_id: uuid.UUID,
+    background_tasks: BackgroundTasks,
+) -> Any:
     """
     Delete a user.
+
+    The user is deactivated immediately; its items, notices and rules are
+    deleted in the background. Progress is available from
+    ``/users/deletion-jobs/{job_id}``.
     """
     user = session.get(User, user_id)
     if not user:
@@ -226,11 +315,21 @@ def delete_user(
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
+    job = jobs.start_user_deletion(session=session, user=user)
+    background_tasks.add_task(jobs.run_user_deletion, job.id)
+    return UserDeletionScheduled(message="User deletion scheduled", job_id=job.id)
 
-    # Delete the user's items explicitly
-    items_statement = delete(Item).where(col(Item.owner_id) == user_id)
-    session.exec(items_statement)  # type: ignore
 
-    session.delete(user)
-    session.commit()
-    return Message(message="User deleted successfully")
+@router.get(
+    "/deletion-jobs/{job_id}",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=UserDeletionJobPublic,
+)
+def read_user_deletion_job(session: SessionDep, job_id: uuid.UUID) -> Any:
+    """
+    Get the progress of a user deletion job.
+    """
+    job = session.get(UserDeletionJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return job
@@ -1,11 +1,14 @@
 from typing import Any
 from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser, CurrentUser
-from app.models import Message
+from app.api.deps import get_current_active_superuser, get_metrics_reader, CurrentUser
+from app.models import Message, SlowQueriesPublic, SlowQueryPublic
 from app.utils import generate_test_email, send_email
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.slow_queries import slow_queries
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
@@ -34,3 +37,35 @@ async def health_check() -> bool:
 
 
 
+
+
+@router.get(
+    "/metrics",
+    dependencies=[Depends(get_metrics_reader)],
+    response_class=PlainTextResponse,
+)
+async def read_metrics() -> PlainTextResponse:
+    """
+    Request, database and threadpool metrics of this worker in the Prometheus
+    text format.
+    """
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@router.get(
+    "/slow-queries",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=SlowQueriesPublic,
+)
+def read_slow_queries() -> Any:
+    """
+    Recent statements of this worker slower than ``SLOW_QUERY_THRESHOLD_MS``
+    or cancelled by the statement timeout, slowest first.
+    """
+    entries = slow_queries.entries()
+    return SlowQueriesPublic(
+        data=[SlowQueryPublic.model_validate(entry) for entry in entries],
+        count=len(entries),
+    )
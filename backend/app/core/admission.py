@@ -0,0 +1,222 @@
+import asyncio
+import math
+import time
+from collections import deque
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Paths below API_V1_STR, matched by prefix
+EXEMPT_PATHS = ("/utils/health-check", "/utils/metrics")
+AUTH_PATHS = (
+    "/login/",
+    "/password-recovery",
+    "/reset-password",
+    "/users/signup",
+    "/users/me/password",
+)
+ANALYTICS_PATHS = ("/fake_analysis_chart_data", "/chart_data", "/activities")
+READ_METHODS = {"GET", "HEAD"}
+
+# Multiplicative decrease applied to an adaptive limit when latency is too high
+BACKOFF = 0.9
+
+
+def route_group(method: str, path: str) -> str | None:
+    """
+    The admission group of a request, or None when it is never limited.
+    """
+    if not path.startswith(settings.API_V1_STR):
+        return None
+    path = path[len(settings.API_V1_STR) :]
+    if path.startswith(EXEMPT_PATHS):
+        return None
+    if path.startswith(AUTH_PATHS):
+        return "auth"
+    if path.startswith(ANALYTICS_PATHS):
+        return "analytics"
+    return "reads" if method in READ_METHODS else "writes"
+
+
+class AdmissionLimit:
+    """
+    Concurrency limit with a bounded FIFO wait queue for one route group.
+
+    At most ``limit`` requests run at once; up to ``queue_size`` more wait,
+    each for at most ``queue_timeout`` seconds. Anything beyond that is
+    rejected right away, so a slow database sheds load instead of growing a
+    backlog that every request has to wait through.
+
+    When ``adaptive``, the limit follows observed latency (AIMD): it grows by
+    about one per ``limit`` fast completions while the limit is in use, and
+    shrinks by ``BACKOFF`` (at most once per slow request's duration) when a
+    request takes longer than ``target_latency``, staying between
+    ``min_limit`` and ``max_limit``.
+
+    Only used from the event loop, so it needs no locking.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        *,
+        adaptive: bool = False,
+        target_latency: float = 0.25,
+        min_limit: int = 1,
+        max_limit: int | None = None,
+    ) -> None:
+        self.limit = float(limit)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit if max_limit is not None else limit * 4
+        self.in_flight = 0
+        # Moving average of how long admitted requests take
+        self.latency = 0.0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._last_decrease = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> str | None:
+        """
+        Wait for a slot. Returns None once admitted, or why the request is
+        rejected: ``"queue_full"`` or ``"queue_timeout"``.
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            done, _ = await asyncio.wait((waiter,), timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # The client went away; give back a slot handed over meanwhile
+            if waiter.done():
+                self.release(None)
+            else:
+                self._waiters.remove(waiter)
+            raise
+        if not done:
+            self._waiters.remove(waiter)
+            return "queue_timeout"
+        # release() handed its slot over without decrementing in_flight
+        return None
+
+    def release(self, latency: float | None) -> None:
+        """
+        Free the slot of a request that took ``latency`` seconds (None when
+        it did not run), handing it to the next waiter if the limit allows.
+        """
+        if latency is not None:
+            self.latency += (latency - self.latency) * 0.1
+            if self.adaptive:
+                self._adapt(latency)
+        if self._waiters and self.in_flight <= int(self.limit):
+            self._waiters.popleft().set_result(None)
+            return
+        self.in_flight -= 1
+
+    def _adapt(self, latency: float) -> None:
+        if latency > self.target_latency:
+            now = time.monotonic()
+            # One burst of slow responses counts as a single congestion signal
+            if now - self._last_decrease >= latency:
+                self._last_decrease = now
+                self.limit = max(self.min_limit, self.limit * BACKOFF)
+        elif self.in_flight >= int(self.limit):
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the queue has likely drained, at least one.
+        """
+        estimate = self.latency * (len(self._waiters) + 1) / max(int(self.limit), 1)
+        return max(1, math.ceil(estimate))
+
+
+def make_limits() -> dict[str, AdmissionLimit]:
+    """
+    One limit per route group from the settings; a limit of 0 leaves the
+    group unlimited.
+    """
+    limits = {
+        "auth": settings.ADMISSION_AUTH_LIMIT,
+        "reads": settings.ADMISSION_READS_LIMIT,
+        "writes": settings.ADMISSION_WRITES_LIMIT,
+        "analytics": settings.ADMISSION_ANALYTICS_LIMIT,
+    }
+    return {
+        group: AdmissionLimit(
+            limit,
+            settings.ADMISSION_QUEUE_SIZE,
+            settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            adaptive=settings.ADMISSION_ADAPTIVE,
+            target_latency=settings.ADMISSION_TARGET_LATENCY_MS / 1000,
+        )
+        for group, limit in limits.items()
+        if limit > 0
+    }
+
+
+class AdmissionControlMiddleware:
+    """
+    Limit how many requests of each route group run at once, rejecting the
+    excess with ``503 Service Unavailable`` and a ``Retry-After`` header
+    rather than letting it queue up in the threadpool.
+    """
+
+    def __init__(
+        self, app: ASGIApp, limits: dict[str, AdmissionLimit] | None = None
+    ) -> None:
+        self.app = app
+        self.limits = make_limits() if limits is None else limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group = route_group(scope["method"], scope["path"])
+        limit = self.limits.get(group) if group else None
+        if group is None or limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        rejected = await limit.acquire()
+        if rejected:
+            metrics.admission_rejected.inc((group, rejected))
+            await self._reject(send, limit.retry_after())
+            return
+        start = time.perf_counter()
+        latency = None
+        try:
+            await self.app(scope, receive, send)
+            latency = time.perf_counter() - start
+        finally:
+            # A request that failed tells nothing about the limit's latency
+            limit.release(latency)
+
+    @staticmethod
+    async def _reject(send: Send, retry_after: int) -> None:
+        body = b'{"detail":"Server busy, retry later"}'
+        start: Message = {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        }
+        await send(start)
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,55 @@
+import hashlib
+import math
+import threading
+from collections.abc import Iterable, Iterator
+
+
+class BloomFilter:
+    """
+    Compact set of strings that can answer "definitely not present" or
+    "probably present".
+
+    Sized for ``capacity`` keys at a false-positive rate of ``error_rate``
+    (about 1.2 bytes per key at 1%); there are no false negatives. The
+    ``hashes`` bit positions of a key come from one BLAKE2b digest by double
+    hashing. Lookups are lock-free; additions are serialised, as setting a
+    bit is a read-modify-write of its byte.
+    """
+
+    def __init__(
+        self, capacity: int, error_rate: float = 0.01, keys: Iterable[str] = ()
+    ) -> None:
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+        for key in keys:
+            self.add(key)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        # Odd, so the probe sequence does not cycle early
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            for position in self._positions(key):
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
@@ -0,0 +1,250 @@
+import threading
+import time
+import zlib
+from collections.abc import Callable
+from typing import Protocol
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+
+class Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level: int) -> None:
+        # Brotli's 0-11 quality; gzip-like levels map onto the fast end
+        self._compressor = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.process(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush())
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.finish())
+
+
+class ZstdEncoder:
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return bytes(self._compressor.compress(data))
+
+    def flush(self) -> bytes:
+        return bytes(self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+    def finish(self) -> bytes:
+        return bytes(self._compressor.flush())
+
+
+# In order of preference when a client accepts several
+ENCODERS: dict[str, Callable[[int], Encoder]] = {}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstandard is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+ENCODERS["gzip"] = GzipEncoder
+
+
+def select_encoding(accept_encoding: str) -> str | None:
+    """
+    Pick the preferred supported encoding the client accepts (``q`` > 0).
+    """
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip())
+    for encoding in ENCODERS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    encoder = ENCODERS[encoding](level)
+    return encoder.compress(data) + encoder.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies with brotli, zstd (when installed) or gzip.
+
+    Bodies smaller than ``minimum_size`` are sent as is. Streaming responses
+    are buffered only until they cross the threshold; after that every chunk
+    is compressed and flushed as it arrives, so NDJSON/CSV exports keep
+    streaming. Responses that already carry a ``Content-Encoding`` (such as
+    the precompressed cache entries below) pass through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, level: int = 6) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, encoding, self.minimum_size, self.level)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int, level: int) -> None:
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.level = level
+        self.start_message: Message | None = None
+        self.passthrough = False
+        self.encoder: Encoder | None = None
+        self.buffer = b""
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = "content-encoding" in headers or not content_type.startswith(
+                COMPRESSIBLE_TYPES
+            )
+            if self.passthrough:
+                await self._send(message)
+            else:
+                self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.encoder is None:
+            self.buffer += body
+            if len(self.buffer) < self.minimum_size:
+                if more_body:
+                    return
+                # Whole body is below the threshold: send it uncompressed
+                await self._start(compressed=False)
+                await self._send({"type": "http.response.body", "body": self.buffer})
+                return
+            self.encoder = ENCODERS[self.encoding](self.level)
+            body, self.buffer = self.buffer, b""
+            if not more_body:
+                data = self.encoder.compress(body) + self.encoder.finish()
+                await self._start(compressed=True, content_length=len(data))
+                await self._send({"type": "http.response.body", "body": data})
+                return
+            await self._start(compressed=True)
+        if more_body:
+            data = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            data = self.encoder.compress(body) + self.encoder.finish()
+        await self._send(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
+
+    async def _start(self, *, compressed: bool, content_length: int | None = None) -> None:
+        assert self.start_message is not None
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        if compressed:
+            headers["Content-Encoding"] = self.encoding
+            if content_length is None:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(content_length)
+        await self._send(self.start_message)
+
+
+class PrecompressedCache:
+    """
+    Small TTL cache of encoded response bodies, each kept alongside its
+    compressed variants so repeated hits are served without recompressing.
+    """
+
+    def __init__(self, ttl: float, level: int = 6) -> None:
+        self.ttl = ttl
+        self.level = level
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, dict[str, bytes]]] = {}
+
+    def response(
+        self,
+        request: Request,
+        key: str,
+        build: Callable[[], bytes],
+        media_type: str = "application/json",
+    ) -> Response:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                entry = (now + self.ttl, {"identity": build()})
+                self._entries[key] = entry
+            variants = entry[1]
+            encoding = select_encoding(request.headers.get("accept-encoding", ""))
+            headers = {"Vary": "Accept-Encoding"}
+            if encoding is None:
+                return Response(variants["identity"], media_type=media_type, headers=headers)
+            if encoding not in variants:
+                variants[encoding] = compress(variants["identity"], encoding, self.level)
+            headers["Content-Encoding"] = encoding
+            return Response(variants[encoding], media_type=media_type, headers=headers)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
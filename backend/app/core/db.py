@@ -1,11 +1,130 @@
+import random
+import threading
+import time
+from typing import Any, Literal
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
 from sqlmodel import Session, create_engine, select
 
 from app import crud
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.slow_queries import record_slow_queries
 from app.models import User, UserCreate
 
+
+def make_engine(
+    uri: str, prepare_threshold: int | None | Literal["settings"] = "settings"
+) -> Engine:
+    """
+    Create an engine with the pool, statement-preparation, compiled-cache
+    and statement-timeout settings, instrumented for metrics and the slow-query
+    log. ``prepare_threshold`` overrides ``POSTGRES_PREPARE_THRESHOLD`` (used
+    by the prepared-statement benchmark).
+    """
+    if prepare_threshold == "settings":
+        prepare_threshold = settings.POSTGRES_PREPARE_THRESHOLD
+    connect_args: dict[str, Any] = {"prepare_threshold": prepare_threshold}
+    if settings.POSTGRES_TRANSACTION_POOLING:
+        # Neither prepared statements nor startup options survive a
+        # transaction-pooling proxy; the timeout is set per transaction instead
+        connect_args["prepare_threshold"] = None
+    else:
+        # The default timeout is set once per connection, at no cost per query
+        connect_args["options"] = (
+            f"-c statement_timeout={settings.POSTGRES_STATEMENT_TIMEOUT_MS}"
+        )
+    new_engine = create_engine(
+        uri,
+        query_cache_size=settings.SQLALCHEMY_QUERY_CACHE_SIZE,
+        pool_size=settings.POSTGRES_POOL_SIZE,
+        max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+        connect_args=connect_args,
+    )
+
+    @event.listens_for(new_engine, "connect")
+    def set_prepared_max(dbapi_connection: Any, _: Any) -> None:
+        dbapi_connection.prepared_max = settings.POSTGRES_PREPARED_MAX
+
+    instrument_engine(new_engine)
+    record_slow_queries(new_engine)
+    return new_engine
+
+
+def set_statement_timeout(session: Session, milliseconds: int) -> None:
+    """
+    Override the statement timeout for the rest of ``session``: it is applied
+    with ``SET LOCAL`` at the start of each of its transactions, including
+    the current one.
+    """
+    session.info["statement_timeout"] = milliseconds
+    if session.in_transaction():
+        _apply_statement_timeout(session.connection(), milliseconds)
+
+
+def _apply_statement_timeout(connection: Connection, milliseconds: int) -> None:
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(milliseconds)}")
+
+
+@event.listens_for(Session, "after_begin")
+def _set_local_statement_timeout(
+    session: Session, _transaction: Any, connection: Connection
+) -> None:
+    milliseconds = session.info.get("statement_timeout")
+    if milliseconds is None and settings.POSTGRES_TRANSACTION_POOLING:
+        milliseconds = settings.POSTGRES_STATEMENT_TIMEOUT_MS
+    if milliseconds is not None:
+        _apply_statement_timeout(connection, milliseconds)
+
+
 # The SQLALCHEMY_DATABASE_URI is now directly a string
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI)
+engine = make_engine(settings.SQLALCHEMY_DATABASE_URI)
+
+# Read-only traffic is spread over these when configured
+replica_engines = [make_engine(uri) for uri in settings.SQLALCHEMY_REPLICA_URIS]
+
+
+def read_engine() -> Engine:
+    """
+    An engine for reads that tolerate replication lag: a random replica, or
+    the primary when there are none.
+    """
+    if not replica_engines:
+        return engine
+    return random.choice(replica_engines)
+
+
+class RecentWriters:
+    """
+    Clients (keyed by a digest of their credentials) that wrote within the
+    last ``window`` seconds, so their reads can stay on the primary until
+    replicas have caught up.
+
+    Kept per process: with several workers a client's next read may land on a
+    worker that did not see the write, so ``window`` should cover the typical
+    replication lag rather than rely on stickiness alone.
+    """
+
+    def __init__(self, window: float, max_size: int = 100_000) -> None:
+        self.window = window
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._until: dict[str, float] = {}
+
+    def mark(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= self.max_size:
+                self._until = {k: t for k, t in self._until.items() if t > now}
+            self._until[key] = now + self.window
+
+    def is_recent(self, key: str) -> bool:
+        until = self._until.get(key)
+        return until is not None and until > time.monotonic()
+
+
+recent_writers = RecentWriters(settings.READ_YOUR_WRITES_SECONDS)
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -0,0 +1,314 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from contextvars import ContextVar
+from typing import Any
+
+from anyio import to_thread
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Upper bounds in seconds; the implicit +Inf bucket is the count
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+UNMATCHED_ROUTE = "unmatched"
+
+# [query count, query seconds] of the request being handled. Threadpool
+# workers run with a copy of the request's context, so the list is shared and
+# the engine events below can add to it from any thread.
+_db_stats: ContextVar[list[Any] | None] = ContextVar("db_stats", default=None)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram keyed by one label value.
+
+    Observations are cheap (a bisect and three additions) and not locked:
+    the metrics middleware only observes from the event loop thread.
+    """
+
+    def __init__(self, name: str, help: str, label: str, buckets: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label value -> [per-bucket counts..., sum, count]
+        self._series: dict[str, list[Any]] = {}
+
+    def observe(self, key: str, value: float) -> None:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series, strict=False):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{self.label}="{key}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'{self.name}_bucket{{{self.label}="{key}",le="+Inf"}} {series[-1]}'
+            )
+            lines.append(f'{self.name}_sum{{{self.label}="{key}"}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{self.label}="{key}"}} {series[-1]}')
+        return lines
+
+
+class Counter:
+    """
+    Counter keyed by a tuple of label values.
+
+    Unlike ``Histogram``, increments are locked: sync dependencies count from
+    threadpool threads (e.g. the token caches).
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: defaultdict[tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, key: tuple[str, ...], value: float = 1) -> None:
+        with self._lock:
+            self._values[key] += value
+
+    def value(self, key: tuple[str, ...]) -> float:
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = ",".join(
+                f'{label}="{item}"'
+                for label, item in zip(self.labels, key, strict=True)
+            )
+            lines.append(f"{self.name}{{{labels}}} {value:g}")
+        return lines
+
+
+class Gauge:
+    """
+    Gauge read from a callback at scrape time.
+    """
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def collect(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.read():g}",
+        ]
+
+
+class Metrics:
+    """
+    Request, database and threadpool metrics of this worker process.
+    """
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        # Set by the threadpool probe (app.core.threadpool)
+        self.threadpool_wait = 0.0
+        self.latency = Histogram(
+            "http_request_duration_seconds",
+            "Time from receiving a request to sending the last body chunk.",
+            "route",
+            LATENCY_BUCKETS,
+        )
+        self.requests = Counter(
+            "http_requests_total",
+            "Responses sent, by route and status code.",
+            ("route", "status"),
+        )
+        self.db_queries = Counter(
+            "db_queries_total",
+            "SQL statements executed while handling requests, by route.",
+            ("route",),
+        )
+        self.db_seconds = Counter(
+            "db_query_duration_seconds_total",
+            "Time spent executing SQL statements while handling requests, by route.",
+            ("route",),
+        )
+        self.admission_rejected = Counter(
+            "admission_rejected_total",
+            "Requests shed by admission control, by route group and reason.",
+            ("group", "reason"),
+        )
+        self.token_revocation_checks = Counter(
+            "token_revocation_checks_total",
+            "Access token revocation checks: ruled out by the Bloom filter, "
+            "confirmed not revoked in the database, or revoked.",
+            ("result",),
+        )
+        self.verified_token_cache = Counter(
+            "verified_token_cache_requests_total",
+            "Access token lookups in the verified-token cache: hits skip "
+            "signature verification.",
+            ("result",),
+        )
+        self.gauges = [
+            Gauge(
+                "http_requests_in_flight",
+                "Requests currently being handled.",
+                lambda: self.in_flight,
+            ),
+            Gauge(
+                "threadpool_tokens_total",
+                "Size of the threadpool running sync routes and dependencies.",
+                lambda: to_thread.current_default_thread_limiter().total_tokens,
+            ),
+            Gauge(
+                "threadpool_tokens_borrowed",
+                "Threadpool workers currently busy.",
+                lambda: to_thread.current_default_thread_limiter().borrowed_tokens,
+            ),
+            Gauge(
+                "threadpool_tasks_waiting",
+                "Tasks waiting for a free threadpool worker.",
+                lambda: to_thread.current_default_thread_limiter()
+                .statistics()
+                .tasks_waiting,
+            ),
+            Gauge(
+                "threadpool_wait_seconds",
+                "How long the latest probe waited for a threadpool worker.",
+                lambda: self.threadpool_wait,
+            ),
+            Gauge(
+                "verified_token_cache_hit_ratio",
+                "Share of access token lookups answered by the verified-token cache.",
+                self._verified_token_cache_hit_ratio,
+            ),
+        ]
+
+    def _verified_token_cache_hit_ratio(self) -> float:
+        hits = self.verified_token_cache.value(("hit",))
+        total = hits + self.verified_token_cache.value(("miss",))
+        return hits / total if total else 0.0
+
+    def observe(
+        self, route: str, status: int, seconds: float, db_stats: list[Any]
+    ) -> None:
+        self.latency.observe(route, seconds)
+        self.requests.inc((route, str(status)))
+        if db_stats[0]:
+            self.db_queries.inc((route,), db_stats[0])
+            self.db_seconds.inc((route,), db_stats[1])
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format. Must be called
+        from the event loop, which owns the threadpool limiter.
+        """
+        lines: list[str] = []
+        for metric in (
+            self.latency,
+            self.requests,
+            self.db_queries,
+            self.db_seconds,
+            self.admission_rejected,
+            self.token_revocation_checks,
+            self.verified_token_cache,
+            *self.gauges,
+        ):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """
+    Record latency, status and database usage per route.
+
+    Routes are keyed by their OpenAPI operation id (``custom_generate_unique_id``
+    in ``app.main``), which the router leaves in the scope after matching.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db_stats = [0, 0.0]
+        token = _db_stats.set(db_stats)
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.in_flight -= 1
+            _db_stats.reset(token)
+            route = scope.get("route")
+            metrics.observe(
+                getattr(route, "unique_id", UNMATCHED_ROUTE), status, elapsed, db_stats
+            )
+
+
+def current_db_stats() -> list[Any] | None:
+    """
+    ``[query count, query seconds]`` of the request being handled, if any.
+    """
+    return _db_stats.get()
+
+
+def _before_cursor_execute(conn: Any, *_: Any) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, *_: Any) -> None:
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_stats = _db_stats.get()
+    if db_stats is not None:
+        db_stats[0] += 1
+        db_stats[1] += elapsed
+
+
+def _handle_error(context: Any) -> None:
+    # A failed statement never reaches after_cursor_execute
+    starts = context.connection.info.get("query_start") if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Count statements executed through ``engine`` towards the current request.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Engine, delete
+from sqlmodel import Session, col, select
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import metrics
+from app.models import RefreshToken, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Incremental refreshes look back this far, to pick up revocations whose
+# transaction was still in flight during the previous refresh
+REFRESH_OVERLAP = timedelta(seconds=5)
+# The filter is rebuilt from scratch this often, dropping expired tokens
+REBUILD_INTERVAL_SECONDS = 3600.0
+
+
+class TokenRevocations:
+    """
+    Revoked access tokens, by ``jti``.
+
+    Every worker keeps the ids of unexpired revoked tokens in a Bloom filter,
+    so checking a token that was not revoked (nearly every request) costs a
+    few hash probes and no query; only filter hits are confirmed against the
+    ``revoked_token`` table. Revocations made by this worker are added to the
+    filter at once, those of other workers on the next refresh. Hits are
+    confirmed on the primary, never on a read replica.
+
+    Until the filter has been loaded, every check goes to the database.
+    """
+
+    def __init__(
+        self,
+        db_engine: Engine,
+        *,
+        refresh_interval: float,
+        capacity: int,
+        error_rate: float,
+    ) -> None:
+        self.engine = db_engine
+        self.refresh_interval = refresh_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter: BloomFilter | None = None
+        self._refresh_lock = threading.Lock()
+        self._since: datetime | None = None
+        self._rebuilt_at = 0.0
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def revoke(self, session: Session, jti: str, expires_at: datetime) -> None:
+        session.merge(RevokedToken(jti=jti, expires_at=expires_at))
+        session.commit()
+        bloom = self._filter
+        if bloom is not None:
+            bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        bloom = self._filter
+        if bloom is not None and jti not in bloom:
+            metrics.token_revocation_checks.inc(("filtered",))
+            return False
+        # On the primary: a replica may not have the revocation yet
+        with Session(self.engine) as session:
+            revoked = session.get(RevokedToken, jti) is not None
+        metrics.token_revocation_checks.inc(("revoked" if revoked else "confirmed",))
+        return revoked
+
+    def rebuild(self) -> None:
+        """
+        Load every unexpired revoked token into a new filter, and purge the
+        expired rows (and the expired refresh tokens).
+        """
+        with self._refresh_lock, Session(self.engine) as session:
+            started = datetime.now()
+            session.exec(  # type: ignore[call-overload]
+                delete(RevokedToken).where(col(RevokedToken.expires_at) < started)
+            )
+            session.exec(  # type: ignore[call-overload]
+                delete(RefreshToken).where(col(RefreshToken.expires_at) < started)
+            )
+            session.commit()
+            jtis = session.exec(select(RevokedToken.jti)).all()
+            # Headroom for the revocations until the next rebuild
+            bloom = BloomFilter(
+                max(self.capacity, 2 * len(jtis)), self.error_rate, jtis
+            )
+            self._filter = bloom
+            self._since = started - REFRESH_OVERLAP
+            self._rebuilt_at = time.monotonic()
+
+    def refresh(self) -> None:
+        """
+        Add the tokens revoked since the last refresh, rebuilding the filter
+        when it is due or full.
+        """
+        bloom = self._filter
+        if (
+            bloom is None
+            or self._since is None
+            or bloom.count >= bloom.capacity
+            or time.monotonic() - self._rebuilt_at >= REBUILD_INTERVAL_SECONDS
+        ):
+            self.rebuild()
+            return
+        with self._refresh_lock, Session(self.engine) as session:
+            started = datetime.now()
+            jtis = session.exec(
+                select(RevokedToken.jti).where(
+                    col(RevokedToken.revoked_at) >= self._since
+                )
+            ).all()
+            # The overlap with the previous refresh brings back tokens already
+            # in the filter; adding them again would only inflate the count
+            for jti in jtis:
+                if jti not in bloom:
+                    bloom.add(jti)
+            self._since = started - REFRESH_OVERLAP
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Failed to load revoked tokens, checking the database")
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="token-revocation-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Failed to refresh revoked tokens, will retry")
+
+
+token_revocations = TokenRevocations(
+    engine,
+    refresh_interval=settings.TOKEN_REVOCATION_REFRESH_SECONDS,
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+)
@@ -1,3 +1,8 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -5,6 +10,7 @@ import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import metrics
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -12,13 +18,69 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
-    expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+def create_access_token(
+    subject: str | Any, expires_delta: timedelta, session_id: str | None = None
+) -> str:
+    now = datetime.now(timezone.utc)
+    expire = now + expires_delta
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        # Sub-second, so a token issued right after a password change is not
+        # mistaken for one issued before it
+        "iat": now.timestamp(),
+        "jti": uuid.uuid4().hex,
+    }
+    if session_id:
+        to_encode["sid"] = session_id
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+class VerifiedTokenCache:
+    """
+    LRU of the decoded claims of access tokens whose signature was already
+    verified, keyed by a BLAKE2b digest of the token so no token is kept in
+    memory. A hit is only returned until the token's expiry, after which the
+    token has to be verified (and rejected) again.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=32).digest()
+
+    def get(self, token: str) -> Any:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+            elif entry is not None:
+                del self._entries[key]
+                entry = None
+        metrics.verified_token_cache.inc(("miss",) if entry is None else ("hit",))
+        return None if entry is None else entry[0]
+
+    def put(self, token: str, claims: Any, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
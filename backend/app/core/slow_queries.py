@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any
+
+from psycopg import errors
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bind parameters whose name contains one of these are not kept
+_REDACTED_PARAMETERS = ("password", "token", "secret")
+_MAX_PARAMETER_LENGTH = 200
+
+
+def _redact(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {
+            name: "<redacted>"
+            if any(part in name.lower() for part in _REDACTED_PARAMETERS)
+            else _redact(value)
+            for name, value in parameters.items()
+        }
+    if isinstance(parameters, list | tuple):
+        return [_redact(value) for value in parameters]
+    if isinstance(parameters, str | bytes) and len(parameters) > _MAX_PARAMETER_LENGTH:
+        return f"{parameters[:_MAX_PARAMETER_LENGTH]!r}..."
+    if parameters is None or isinstance(parameters, bool | int | float | str):
+        return parameters
+    return str(parameters)
+
+
+def _explainable(statement: str) -> bool:
+    # EXPLAIN ANALYZE runs the statement again: only plain reads qualify
+    head = statement.lstrip()[:6].upper()
+    return head == "SELECT" and "FOR UPDATE" not in statement.upper()
+
+
+class SlowQueryLog:
+    """
+    The last ``size`` statements slower than ``threshold`` seconds, or
+    cancelled by ``statement_timeout``, with their parameters.
+
+    For a ``sample_rate`` share of slow SELECTs an ``EXPLAIN (ANALYZE,
+    BUFFERS)`` plan is captured on a background thread, one at a time, and
+    attached to the entry once ready. Kept per process.
+    """
+
+    def __init__(self, size: int, threshold: float, sample_rate: float) -> None:
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self._entries: deque[dict[str, Any]] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._explaining = False
+
+    def record(
+        self,
+        engine: Engine,
+        statement: str,
+        parameters: Any,
+        seconds: float,
+        error: str | None = None,
+    ) -> None:
+        entry = {
+            "statement": statement,
+            "parameters": _redact(parameters),
+            "duration_ms": round(seconds * 1000, 3),
+            "recorded_at": datetime.now(),
+            "error": error,
+            "plan": None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            explain = (
+                error is None
+                and not self._explaining
+                and _explainable(statement)
+                and random.random() < self.sample_rate
+            )
+            if explain:
+                self._explaining = True
+        if explain:
+            threading.Thread(
+                target=self._explain,
+                args=(engine, entry, statement, parameters),
+                name="slow-query-explain",
+                daemon=True,
+            ).start()
+
+    def _explain(
+        self, engine: Engine, entry: dict[str, Any], statement: str, parameters: Any
+    ) -> None:
+        try:
+            with engine.connect() as connection:
+                rows = connection.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                ).all()
+                connection.rollback()
+            entry["plan"] = "\n".join(row[0] for row in rows)
+        except Exception:
+            logger.warning("Could not explain slow query", exc_info=True)
+        finally:
+            self._explaining = False
+
+    def entries(self) -> list[dict[str, Any]]:
+        """
+        Recorded statements, slowest first.
+        """
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda entry: entry["duration_ms"], reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+slow_queries = SlowQueryLog(
+    settings.SLOW_QUERY_LOG_SIZE,
+    settings.SLOW_QUERY_THRESHOLD_MS / 1000,
+    settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+)
+
+
+def _before_cursor_execute(conn: Any, *_: Any) -> None:
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any,
+    _cursor: Any,
+    statement: str,
+    parameters: Any,
+    _context: Any,
+    executemany: bool,
+) -> None:
+    elapsed = time.perf_counter() - conn.info["slow_query_start"].pop()
+    if elapsed >= slow_queries.threshold and not statement.startswith("EXPLAIN"):
+        # Parameters of an executemany are a list of rows; not explained
+        slow_queries.record(
+            conn.engine, statement, None if executemany else parameters, elapsed
+        )
+
+
+def _handle_error(context: Any) -> None:
+    starts = (
+        context.connection.info.get("slow_query_start") if context.connection else None
+    )
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if isinstance(context.original_exception, errors.QueryCanceled):
+        slow_queries.record(
+            context.engine,
+            context.statement or "",
+            context.parameters,
+            elapsed,
+            error=str(context.original_exception).strip(),
+        )
+
+
+def record_slow_queries(engine: Engine) -> None:
+    """
+    Keep statements executed through ``engine`` that are slow or cancelled in
+    ``slow_queries``.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
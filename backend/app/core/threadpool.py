@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+
+from anyio import to_thread
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# At most one saturation warning per this many seconds
+WARNING_INTERVAL_SECONDS = 60.0
+
+
+def configure_threadpool() -> None:
+    """
+    Size the threadpool that runs sync routes and dependencies. Must be called
+    from the event loop (e.g. in the lifespan), which owns the limiter.
+    """
+    to_thread.current_default_thread_limiter().total_tokens = (
+        settings.THREADPOOL_TOKENS
+    )
+    connections = settings.POSTGRES_POOL_SIZE + settings.POSTGRES_MAX_OVERFLOW
+    if settings.THREADPOOL_TOKENS > connections:
+        logger.warning(
+            "THREADPOOL_TOKENS (%d) exceeds the database pool "
+            "(POSTGRES_POOL_SIZE + POSTGRES_MAX_OVERFLOW = %d); busy workers "
+            "may wait for a connection",
+            settings.THREADPOOL_TOKENS,
+            connections,
+        )
+
+
+class ThreadpoolProbe:
+    """
+    Periodically time a no-op through the threadpool, which waits behind
+    every task already queued for a worker, and publish the wait as the
+    ``threadpool_wait_seconds`` metric.
+    """
+
+    def __init__(self, interval: float, warning_threshold: float) -> None:
+        self.interval = interval
+        self.warning_threshold = warning_threshold
+        self._task: asyncio.Task[None] | None = None
+        self._last_warning = 0.0
+
+    async def measure(self) -> float:
+        # What the probe queues behind, for the warning
+        limiter = to_thread.current_default_thread_limiter()
+        busy, waiting = limiter.borrowed_tokens, limiter.statistics().tasks_waiting
+        start = time.perf_counter()
+        await to_thread.run_sync(lambda: None)
+        wait = time.perf_counter() - start
+        metrics.threadpool_wait = wait
+        now = time.monotonic()
+        if (
+            wait > self.warning_threshold
+            and now - self._last_warning >= WARNING_INTERVAL_SECONDS
+        ):
+            self._last_warning = now
+            logger.warning(
+                "Threadpool saturated: waited %.0f ms for a worker "
+                "(%d of %d busy, %d tasks waiting before it)",
+                wait * 1000,
+                busy,
+                limiter.total_tokens,
+                waiting,
+            )
+        return wait
+
+    async def _run(self) -> None:
+        while True:
+            await self.measure()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+threadpool_probe = ThreadpoolProbe(
+    settings.THREADPOOL_PROBE_INTERVAL_SECONDS,
+    settings.THREADPOOL_WAIT_WARNING_MS / 1000,
+)
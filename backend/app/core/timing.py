@@ -0,0 +1,123 @@
+import random
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import current_db_stats
+
+REQUEST_HEADER = b"x-server-timing"
+
+_timings: ContextVar["Timings | None"] = ContextVar("timings", default=None)
+
+
+class Timings:
+    """
+    Phase durations of one request, reported in its ``Server-Timing`` header.
+
+    SQL run inside a named phase (e.g. the user lookup) counts towards that
+    phase; the rest is reported as ``db``, with its number of queries. ``app``
+    is whatever is left of the time to the first response byte: routing,
+    validation, the route's own Python and serialisation.
+    """
+
+    def __init__(self, *, sampled: bool, db_stats: list[Any]) -> None:
+        self.sampled = sampled
+        # Set by get_current_user; a requested breakdown is only sent to superusers
+        self.superuser = False
+        self.db_stats = db_stats
+        self.db_start = list(db_stats)
+        self.phases: dict[str, float] = {}
+        self.phase_queries = 0
+        self.phase_sql = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sampled or self.superuser
+
+    def header(self, total: float) -> str:
+        queries = self.db_stats[0] - self.db_start[0] - self.phase_queries
+        sql = self.db_stats[1] - self.db_start[1]
+        db = max(sql - self.phase_sql, 0.0)
+        app = max(total - sum(self.phases.values()) - db, 0.0)
+        entries = [
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()
+        ]
+        entries.append(f'db;dur={db * 1000:.2f};desc="{queries} queries"')
+        entries.append(f"app;dur={app * 1000:.2f}")
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+def current_timings() -> Timings | None:
+    return _timings.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Time the block as ``name`` when the current request is being timed.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    queries_before, sql_before = timings.db_stats
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.phases[name] = timings.phases.get(name, 0.0) + (
+            time.perf_counter() - start
+        )
+        timings.phase_queries += timings.db_stats[0] - queries_before
+        timings.phase_sql += timings.db_stats[1] - sql_before
+
+
+class ServerTimingMiddleware:
+    """
+    Add a ``Server-Timing`` header (auth, user, db, app, total) that browser
+    devtools show next to each request.
+
+    A request is timed when it is sampled (``sample_rate``) or carries an
+    ``X-Server-Timing`` header; the header is only honoured once
+    ``get_current_user`` has seen a superuser. Requests that are neither pay
+    for one header scan.
+
+    Must be installed inside ``MetricsMiddleware``, which counts the queries.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 0.0) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sampled = bool(self.sample_rate) and random.random() < self.sample_rate
+        requested = any(name == REQUEST_HEADER for name, _ in scope["headers"])
+        if not sampled and not requested:
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings(sampled=sampled, db_stats=current_db_stats() or [0, 0.0])
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and timings.enabled:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", timings.header(time.perf_counter() - start)
+                )
+            await send(message)
+
+        token = _timings.set(timings)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
@@ -1,10 +1,27 @@
+import hashlib
+import secrets
 import uuid
+from datetime import datetime, timedelta
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import Uuid, any_, bindparam, delete, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import Session, col, select
 
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
-from app.models import Item, ItemCreate, User, UserCreate, UserUpdate
+from app.models import (
+    DeletedRecord,
+    Item,
+    ItemCreate,
+    Notice,
+    RefreshToken,
+    Rule,
+    RulesBatchUpdate,
+    User,
+    UserCreate,
+    UserUpdate,
+)
 
 
 def create_user(*, session: Session, user_create: UserCreate) -> User:
@@ -24,6 +41,7 @@ def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
         password = user_data["password"]
         hashed_password = get_password_hash(password)
         extra_data["hashed_password"] = hashed_password
+        extra_data["tokens_valid_after"] = datetime.now()
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
@@ -46,9 +64,199 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     return db_user
 
 
+def create_refresh_token(
+    *, session: Session, user_id: uuid.UUID, family_id: uuid.UUID
+) -> str:
+    """
+    Issue a refresh token of ``family_id``. Added to the session, committed
+    by the caller; only its hash is stored.
+    """
+    token = secrets.token_urlsafe(32)
+    session.add(
+        RefreshToken(
+            token_hash=hashlib.sha256(token.encode()).hexdigest(),
+            family_id=family_id,
+            user_id=user_id,
+            expires_at=datetime.now()
+            + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+        )
+    )
+    return token
+
+
+def use_refresh_token(*, session: Session, token: str) -> RefreshToken | None:
+    """
+    Mark a refresh token used and return it, or None when it is unknown,
+    expired or already used.
+
+    The row stays locked until the caller commits, so concurrent uses of one
+    token are serialised and only the first succeeds; the others arrive
+    within ``REFRESH_TOKEN_REUSE_GRACE_SECONDS`` of that use and are only
+    refused. A token used again later was leaked or replayed: its whole
+    family is deleted (and committed), so neither holder can refresh again.
+    """
+    db_token = session.exec(
+        select(RefreshToken)
+        .where(RefreshToken.token_hash == hashlib.sha256(token.encode()).hexdigest())
+        .with_for_update()
+    ).first()
+    now = datetime.now()
+    if not db_token or db_token.expires_at <= now:
+        return None
+    if db_token.used_at is not None:
+        grace = timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+        if now - db_token.used_at < grace:
+            return None
+        revoke_refresh_tokens(session=session, family_id=db_token.family_id)
+        session.commit()
+        return None
+    db_token.used_at = now
+    session.add(db_token)
+    return db_token
+
+
+def revoke_refresh_tokens(*, session: Session, family_id: uuid.UUID) -> None:
+    session.exec(  # type: ignore[call-overload]
+        delete(RefreshToken).where(col(RefreshToken.family_id) == family_id)
+    )
+
+
 def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -> Item:
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
     session.add(db_item)
     session.commit()
     session.refresh(db_item)
     return db_item
+
+
+def copy_items(
+    *, session: Session, items_in: list[ItemCreate], owner_id: uuid.UUID
+) -> int:
+    """
+    Bulk-load items with ``COPY`` into a per-connection staging table, then
+    merge them into ``item`` with one ``INSERT ... SELECT`` and commit.
+    """
+    connection = session.connection()
+    connection.exec_driver_sql(
+        "CREATE TEMP TABLE IF NOT EXISTS item_import "
+        "(LIKE item INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+    now = datetime.now()
+    cursor = connection.connection.cursor()
+    with cursor.copy(
+        "COPY item_import (id, title, description, owner_id, updated_at) FROM STDIN"
+    ) as copy:
+        for item_in in items_in:
+            copy.write_row(
+                (uuid.uuid4(), item_in.title, item_in.description, owner_id, now)
+            )
+    connection.exec_driver_sql(
+        "INSERT INTO item (id, title, description, owner_id, updated_at) "
+        "SELECT id, title, description, owner_id, updated_at FROM item_import"
+    )
+    session.commit()
+    return len(items_in)
+
+
+def batch_update_rules(
+    *, session: Session, owner_id: uuid.UUID, rules_in: RulesBatchUpdate
+) -> int:
+    """
+    Apply the same patch to all of ``rules_in.ids`` owned by ``owner_id`` in a
+    single statement. Returns the number of rules updated.
+    """
+    values: dict[str, Any] = rules_in.model_dump(exclude_none=True, exclude={"ids"})
+    values["updated_at"] = datetime.now()
+    ids = bindparam("ids", value=list(set(rules_in.ids)), type_=ARRAY(Uuid))
+    statement = (
+        update(Rule)
+        .where(col(Rule.id) == any_(ids))
+        .where(col(Rule.owner_id) == owner_id)
+        .values(**values)
+    )
+    result = session.exec(statement)  # type: ignore
+    session.commit()
+    return int(result.rowcount)
+
+
+def record_deletion(
+    *, session: Session, table_name: str, record_id: uuid.UUID, owner_id: uuid.UUID
+) -> None:
+    """
+    Leave a tombstone for a deleted row. Added to the session, committed
+    together with the delete.
+    """
+    session.add(
+        DeletedRecord(table_name=table_name, record_id=record_id, owner_id=owner_id)
+    )
+
+
+def get_changes(
+    *,
+    session: Session,
+    model: type[Item] | type[Notice] | type[Rule],
+    owner_column: Any,
+    since: datetime,
+    owner_id: uuid.UUID | None = None,
+) -> tuple[list[Any], list[uuid.UUID], datetime]:
+    """
+    Rows of ``model`` changed since ``since`` (those of ``owner_id`` only, if
+    given), the ids deleted since then and the high-water mark for the next
+    sync.
+
+    Rows and tombstones are capped at ``SYNC_MAX_ROWS`` each: when either hits
+    the cap, both are cut at its last timestamp and the mark stops just past
+    it, so the client picks up the rest on its next sync. Every row at the cut
+    timestamp is sent, so a bulk write larger than the cap cannot stall the
+    feed.
+    """
+    high_water_mark = sync_high_water_mark()
+    limit = settings.SYNC_MAX_ROWS
+    changed = [model.updated_at >= since]
+    deleted = [
+        DeletedRecord.table_name == model.__tablename__,
+        DeletedRecord.deleted_at >= since,
+    ]
+    if owner_id is not None:
+        changed.append(owner_column == owner_id)
+        deleted.append(DeletedRecord.owner_id == owner_id)
+    rows = session.exec(
+        select(model).where(*changed).order_by(model.updated_at).limit(limit)
+    ).all()
+    tombstones = session.exec(
+        select(DeletedRecord.record_id, DeletedRecord.deleted_at)
+        .where(*deleted)
+        .order_by(DeletedRecord.deleted_at)
+        .limit(limit)
+    ).all()
+    cutoffs = []
+    if len(rows) == limit:
+        cutoffs.append(rows[-1].updated_at)
+    if len(tombstones) == limit:
+        cutoffs.append(tombstones[-1].deleted_at)
+    if not cutoffs:
+        return list(rows), [t.record_id for t in tombstones], high_water_mark
+    cutoff = min(cutoffs)
+    # The cap may have split the rows at the cutoff; read them all again
+    rows = [row for row in rows if row.updated_at < cutoff]
+    rows += session.exec(
+        select(model).where(*changed, model.updated_at == cutoff)
+    ).all()
+    deleted_ids = [t.record_id for t in tombstones if t.deleted_at < cutoff]
+    deleted_ids += session.exec(
+        select(DeletedRecord.record_id).where(
+            *deleted, DeletedRecord.deleted_at == cutoff
+        )
+    ).all()
+    high_water_mark = min(high_water_mark, cutoff + timedelta(microseconds=1))
+    return rows, deleted_ids, high_water_mark
+
+
+def sync_high_water_mark() -> datetime:
+    """
+    High-water mark for a delta-sync response, taken before the rows are read.
+
+    It trails the clock by ``SYNC_OVERLAP_SECONDS``, so the next sync re-sends
+    rows from that window; clients upsert by id, so duplicates are harmless.
+    """
+    return datetime.now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
@@ -0,0 +1,153 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlmodel import Session, and_, col, delete, or_, select, update
+
+from app import crud
+from app.core.config import settings
+from app.core.db import engine
+from app.models import Item, Notice, RefreshToken, Rule, User, UserDeletionJob
+
+logger = logging.getLogger(__name__)
+
+# (progress counter on the job, table, owner column), children before the user
+USER_OWNED_TABLES: list[tuple[str, Any, Any]] = [
+    ("items_deleted", Item, Item.owner_id),
+    ("notices_deleted", Notice, Notice.user_id),
+    ("rules_deleted", Rule, Rule.owner_id),
+]
+
+# A running job whose progress has not moved for this long is taken to belong
+# to a worker that died, and may be claimed again
+STALE_JOB_AFTER = timedelta(minutes=5)
+
+
+def start_user_deletion(*, session: Session, user: User) -> UserDeletionJob:
+    """
+    Deactivate the user right away and record a deletion job for it. The data
+    itself is removed later by ``run_user_deletion``. A user already being
+    deleted gets its unfinished job back instead of a second one.
+    """
+    job = session.exec(
+        select(UserDeletionJob).where(
+            UserDeletionJob.user_id == user.id,
+            UserDeletionJob.status != "completed",
+        )
+    ).first()
+    if job:
+        return job
+    user.is_active = False
+    user.tokens_valid_after = datetime.now()
+    session.exec(  # type: ignore[call-overload]
+        delete(RefreshToken).where(col(RefreshToken.user_id) == user.id)
+    )
+    job = UserDeletionJob(user_id=user.id)
+    session.add(user)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def _claim_job(session: Session, job_id: uuid.UUID) -> UserDeletionJob | None:
+    """
+    Mark a job running, unless it is completed or another worker is running it.
+    """
+    now = datetime.now()
+    result = session.exec(  # type: ignore[call-overload]
+        update(UserDeletionJob)
+        .where(col(UserDeletionJob.id) == job_id)
+        .where(
+            or_(
+                col(UserDeletionJob.status).in_(["pending", "failed"]),
+                and_(
+                    col(UserDeletionJob.status) == "running",
+                    col(UserDeletionJob.updated_at) < now - STALE_JOB_AFTER,
+                ),
+            )
+        )
+        .values(status="running", error=None, updated_at=now)
+    )
+    session.commit()
+    if result.rowcount != 1:
+        return None
+    return session.get(UserDeletionJob, job_id)
+
+
+def run_user_deletion(job_id: uuid.UUID) -> None:
+    """
+    Delete everything a user owns in chunks of ``USER_DELETION_CHUNK_SIZE``
+    rows, leaving tombstones for delta-sync clients, then the user itself.
+
+    Each chunk is its own short transaction that also advances the job's
+    progress counters, so locks are held briefly and an interrupted or failed
+    job picks up where it stopped when it is run again (see
+    ``resume_user_deletions``).
+    """
+    chunk_size = settings.USER_DELETION_CHUNK_SIZE
+    with Session(engine) as session:
+        job = _claim_job(session, job_id)
+        if not job:
+            return
+        try:
+            for counter, model, owner_column in USER_OWNED_TABLES:
+                while True:
+                    chunk = (
+                        select(model.id)
+                        .where(owner_column == job.user_id)
+                        .limit(chunk_size)
+                        .scalar_subquery()
+                    )
+                    deleted = (
+                        session.exec(
+                            delete(model)  # type: ignore
+                            .where(col(model.id).in_(chunk))
+                            .returning(model.id)
+                        )
+                        .scalars()
+                        .all()
+                    )
+                    for record_id in deleted:
+                        crud.record_deletion(
+                            session=session,
+                            table_name=model.__tablename__,
+                            record_id=record_id,
+                            owner_id=job.user_id,
+                        )
+                    setattr(job, counter, getattr(job, counter) + len(deleted))
+                    session.add(job)
+                    session.commit()
+                    if len(deleted) < chunk_size:
+                        break
+            user = session.get(User, job.user_id)
+            if user:
+                session.delete(user)
+            job.status = "completed"
+            session.add(job)
+            session.commit()
+        except Exception as e:
+            logger.exception("User deletion job %s failed", job_id)
+            session.rollback()
+            job.status = "failed"
+            job.error = str(e)[:500]
+            session.add(job)
+            session.commit()
+
+
+def resume_user_deletions() -> None:
+    """
+    Run the deletion jobs that are not completed: those that failed, and
+    those whose background task was lost when a worker stopped. Called at
+    startup; jobs another worker is still running are left to it.
+    """
+    with Session(engine) as session:
+        job_ids = session.exec(
+            select(UserDeletionJob.id).where(UserDeletionJob.status != "completed")
+        ).all()
+    for job_id in job_ids:
+        try:
+            run_user_deletion(job_id)
+        except Exception:
+            logger.exception("Failed to resume user deletion job %s", job_id)
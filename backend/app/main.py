@@ -1,11 +1,26 @@
 import sentry_sdk
 import logging
-from fastapi import FastAPI
+import threading
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.routing import APIRoute
+from psycopg.errors import QueryCanceled
+from sqlalchemy.exc import OperationalError
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core.admission import AdmissionControlMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.counters import rule_counters
+from app.core.metrics import MetricsMiddleware
+from app.core.revocation import token_revocations
+from app.core.threadpool import configure_threadpool, threadpool_probe
+from app.core.timing import ServerTimingMiddleware
+from app.jobs import resume_user_deletions
 
 # Configure logging
 logging.basicConfig(
@@ -33,12 +48,42 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    configure_threadpool()
+    threadpool_probe.start()
+    rule_counters.start()
+    token_revocations.start()
+    # Deletion jobs a stopped worker left unfinished, off the startup path
+    threading.Thread(
+        target=resume_user_deletions, name="user-deletion-resume", daemon=True
+    ).start()
+    try:
+        yield
+    finally:
+        token_revocations.stop()
+        # Flush buffered rule counters before the worker exits
+        rule_counters.stop()
+        await threadpool_probe.stop()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    lifespan=lifespan,
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    level=settings.COMPRESSION_LEVEL,
+)
+
+# Inside CORS, so that browsers can read the Retry-After of a shed request
+app.add_middleware(AdmissionControlMiddleware)
+
 # Set all CORS enabled origins
 if settings.all_cors_origins:
     app.add_middleware(
@@ -49,4 +94,24 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+app.add_middleware(
+    ServerTimingMiddleware, sample_rate=settings.SERVER_TIMING_SAMPLE_RATE
+)
+
+# Outermost, so latency includes compression and CORS handling
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(OperationalError)
+async def statement_timeout_handler(
+    _request: Request, exc: OperationalError
+) -> ORJSONResponse:
+    # A statement cancelled by statement_timeout; other errors remain 500s
+    if isinstance(exc.orig, QueryCanceled):
+        return ORJSONResponse(
+            {"detail": "The request took too long to process"}, status_code=503
+        )
+    raise exc
+
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -1,10 +1,11 @@
 import uuid
 from datetime import datetime
-from typing import Annotated, Any
+from typing import Annotated, Any, Literal
 
-from pydantic import EmailStr
-from sqlalchemy import String, Text, JSON
+from pydantic import EmailStr, model_validator
+from sqlalchemy import JSON, Index, String, Text
 from sqlmodel import Field, Relationship, SQLModel
+from typing_extensions import Self
 
 
 # Shared properties
@@ -57,6 +58,8 @@ class User(UserBase, table=True):
     __tablename__ = "user"
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     hashed_password: str
+    # Access tokens issued before this (e.g. a password change) are revoked
+    tokens_valid_after: datetime | None = None
     items: list["Item"] = Relationship(back_populates="owner")
 
 # Properties to return via API, id is always required
@@ -87,11 +90,15 @@ class ItemUpdate(ItemBase):
 
 # Database model, database table inferred from class name
 class Item(ItemBase, table=True):
+    __table_args__ = (Index("ix_item_owner_id_updated_at", "owner_id", "updated_at"),)
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255)
     owner_id: uuid.UUID = Field(
         foreign_key="user.id", nullable=False
     )
+    updated_at: datetime = Field(
+        default_factory=datetime.now, sa_column_kwargs={"onupdate": datetime.now}
+    )
     owner: User | None = Relationship(back_populates="items")
 
 
@@ -99,6 +106,7 @@ class Item(ItemBase, table=True):
 class ItemPublic(ItemBase):
     id: uuid.UUID
     owner_id: uuid.UUID
+    updated_at: datetime
 
 
 class ItemsPublic(SQLModel):
@@ -106,20 +114,104 @@ class ItemsPublic(SQLModel):
     count: int
 
 
+class ItemImportError(SQLModel):
+    line: int
+    detail: str
+
+
+class ItemsImported(SQLModel):
+    imported: int
+    failed: int
+    # Only the first ITEM_IMPORT_MAX_ERRORS failures are listed
+    errors: list[ItemImportError]
+
+
+# Rows changed since a client's high-water mark, plus ids deleted since then
+class ItemsChanges(SQLModel):
+    data: list[ItemPublic]
+    deleted: list[uuid.UUID]
+    high_water_mark: datetime
+
+
 # Generic message
 class Message(SQLModel):
     message: str
 
 
+# Background deletion of a user and everything they own
+class UserDeletionJobBase(SQLModel):
+    user_id: uuid.UUID
+    status: str = Field(default="pending", max_length=20)  # pending, running, completed, failed
+    items_deleted: int = 0
+    notices_deleted: int = 0
+    rules_deleted: int = 0
+    error: str | None = Field(default=None, max_length=500)
+
+
+class UserDeletionJob(UserDeletionJobBase, table=True):
+    __tablename__ = "user_deletion_job"
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(
+        default_factory=datetime.now, sa_column_kwargs={"onupdate": datetime.now}
+    )
+
+
+class UserDeletionJobPublic(UserDeletionJobBase):
+    id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
+
+
+class UserDeletionScheduled(Message):
+    job_id: uuid.UUID
+
+
 # JSON payload containing access token
 class Token(SQLModel):
     access_token: str
     token_type: str = "bearer"
+    # Exchanged at /login/refresh-token for a new pair before the access
+    # token expires
+    refresh_token: str | None = None
+
+
+class TokenRefresh(SQLModel):
+    refresh_token: str
 
 
 # Contents of JWT token
 class TokenPayload(SQLModel):
     sub: str | None = None
+    # Token id, for revoking a single token; absent from older tokens
+    jti: str | None = None
+    # Refresh token family the token was issued with, ended on logout
+    sid: str | None = None
+    # Issue and expiry times, as seconds since the epoch
+    iat: float | None = None
+    exp: float | None = None
+
+
+# Access token revoked before its expiry (e.g. on logout), by its jti claim
+class RevokedToken(SQLModel, table=True):
+    __tablename__ = "revoked_token"
+    jti: str = Field(primary_key=True, max_length=64)
+    # The row is only needed until the token would have expired anyway
+    expires_at: datetime = Field(index=True)
+    revoked_at: datetime = Field(default_factory=datetime.now, index=True)
+
+
+# Refresh token, stored as the SHA-256 of the opaque token handed out. Each is
+# used once, then replaced by a new one of the same family (one per login);
+# presenting a used token again ends the whole family
+class RefreshToken(SQLModel, table=True):
+    __tablename__ = "refresh_token"
+    token_hash: str = Field(primary_key=True, max_length=64)
+    family_id: uuid.UUID = Field(index=True)
+    user_id: uuid.UUID = Field(index=True)
+    created_at: datetime = Field(default_factory=datetime.now)
+    expires_at: datetime = Field(index=True)
+    used_at: datetime | None = None
 
 
 class NewPassword(SQLModel):
@@ -142,14 +234,21 @@ class NoticeCreate(NoticeBase):
 
 class Notice(NoticeBase, table=True):
     __tablename__ = "notice"
+    __table_args__ = (
+        Index("ix_notice_user_id_updated_at", "user_id", "updated_at"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id", nullable=False)
     created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(
+        default_factory=datetime.now, sa_column_kwargs={"onupdate": datetime.now}
+    )
 
 
 class NoticePublic(NoticeBase):
     id: uuid.UUID
     created_at: datetime
+    updated_at: datetime
 
 
 class NoticesPublic(SQLModel):
@@ -157,6 +256,12 @@ class NoticesPublic(SQLModel):
     count: int
 
 
+class NoticesChanges(SQLModel):
+    data: list[NoticePublic]
+    deleted: list[uuid.UUID]
+    high_water_mark: datetime
+
+
 # Simple Rule model (for table list data)
 class RuleBase(SQLModel):
     name: str = Field(max_length=255)
@@ -173,10 +278,13 @@ class RuleCreate(RuleBase):
 
 class Rule(RuleBase, table=True):
     __tablename__ = "rule"
+    __table_args__ = (Index("ix_rule_updated_at", "updated_at"),)
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False)
+    owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, index=True)
     created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(
+        default_factory=datetime.now, sa_column_kwargs={"onupdate": datetime.now}
+    )
 
 
 class RulePublic(RuleBase):
@@ -190,3 +298,88 @@ class RulesPublic(SQLModel):
     data: list[RulePublic]
     count: int
     success: bool = True
+
+
+class RulesChanges(SQLModel):
+    data: list[RulePublic]
+    deleted: list[uuid.UUID]
+    high_water_mark: datetime
+
+
+# Patch applied to many rules at once from the table's batch actions
+class RulesBatchUpdate(SQLModel):
+    ids: list[uuid.UUID] = Field(min_length=1, max_length=1000)
+    # None leaves the field unchanged
+    status: int | None = None
+    progress: int | None = Field(default=None, ge=0, le=100)
+
+    @model_validator(mode="after")
+    def _has_changes(self) -> Self:
+        if self.status is None and self.progress is None:
+            raise ValueError("Set at least one of status and progress")
+        return self
+
+
+class RulesBatchUpdated(SQLModel):
+    updated: int
+    skipped: int
+    success: bool = True
+
+
+# Tombstone left behind by a delete so that delta-sync clients can drop the row
+class DeletedRecord(SQLModel, table=True):
+    __tablename__ = "deleted_record"
+    __table_args__ = (
+        Index(
+            "ix_deleted_record_table_owner_deleted_at",
+            "table_name",
+            "owner_id",
+            "deleted_at",
+        ),
+        Index("ix_deleted_record_table_deleted_at", "table_name", "deleted_at"),
+    )
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    table_name: str = Field(max_length=50)
+    record_id: uuid.UUID
+    # No foreign key: tombstones outlive the rows (and users) they refer to
+    owner_id: uuid.UUID
+    deleted_at: datetime = Field(default_factory=datetime.now)
+
+
+# Statement kept in the slow-query log
+class SlowQueryPublic(SQLModel):
+    statement: str
+    parameters: Any = None
+    duration_ms: float
+    recorded_at: datetime
+    # Set when the statement was cancelled, e.g. by statement_timeout
+    error: str | None = None
+    # EXPLAIN (ANALYZE, BUFFERS) output, for sampled SELECTs
+    plan: str | None = None
+
+
+class SlowQueriesPublic(SQLModel):
+    data: list[SlowQueryPublic]
+    count: int
+
+
+# Several API calls sent in one HTTP request to /batch
+class BatchSubRequest(SQLModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    # Path relative to the API prefix, e.g. "/users/me" or "/notices?limit=5"
+    path: str = Field(max_length=2048)
+    body: Any | None = None
+
+
+class BatchRequest(SQLModel):
+    requests: list[BatchSubRequest] = Field(min_length=1)
+
+
+class BatchSubResponse(SQLModel):
+    status: int
+    headers: dict[str, str] = {}
+    body: Any | None = None
+
+
+class BatchResponse(SQLModel):
+    responses: list[BatchSubResponse]
@@ -0,0 +1,75 @@
+import gzip
+import json
+from collections.abc import AsyncIterator
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.api.routes import analytics
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+
+
+def test_read_chart_data_compressed(client: TestClient) -> None:
+    analytics.analytics_cache.clear()
+    response = client.get(
+        f"{settings.API_V1_STR}/chart_data",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert "salesData" in response.json()["data"]
+
+
+def test_read_chart_data_cached(client: TestClient) -> None:
+    analytics.analytics_cache.clear()
+    with patch(
+        "app.api.routes.analytics.generate_fake_analytics_data",
+        wraps=analytics.generate_fake_analytics_data,
+    ) as generate:
+        first = client.get(
+            f"{settings.API_V1_STR}/fake_analysis_chart_data",
+            headers={"Accept-Encoding": "gzip"},
+        )
+        second = client.get(
+            f"{settings.API_V1_STR}/fake_analysis_chart_data",
+            headers={"Accept-Encoding": "identity"},
+        )
+    assert generate.call_count == 1
+    assert first.json() == second.json()
+    assert "content-encoding" not in second.headers
+
+
+def test_small_response_not_compressed(client: TestClient) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/utils/health-check/",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.json() is True
+
+
+def test_streaming_response_compressed() -> None:
+    async def chunks() -> AsyncIterator[bytes]:
+        for i in range(100):
+            yield json.dumps({"line": i, "pad": "x" * 32}).encode() + b"\n"
+
+    async def endpoint(_: Request) -> StreamingResponse:
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    app = Starlette(routes=[Route("/", endpoint)])
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    with TestClient(app).stream(
+        "GET", "/", headers={"Accept-Encoding": "gzip"}
+    ) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    lines = gzip.decompress(raw).splitlines()
+    assert [json.loads(line)["line"] for line in lines] == list(range(100))
@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.api import deps
+from app.core.config import settings
+from app.tests.utils.item import create_random_item
+
+
+def test_batch(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    data = {
+        "requests": [
+            {"path": "/users/me"},
+            {"path": f"/items/{item.id}?fields=title"},
+            {"path": "/notices?limit=5"},
+            {"path": "/items/00000000-0000-0000-0000-000000000000"},
+        ]
+    }
+    with patch("app.api.deps.jwt.decode", wraps=deps.jwt.decode) as decode:
+        r = client.post(
+            f"{settings.API_V1_STR}/batch", headers=superuser_token_headers, json=data
+        )
+    assert r.status_code == 200
+    # The token is decoded once for the whole batch
+    assert decode.call_count == 1
+    me, read_item, notices, missing = r.json()["responses"]
+    assert me["status"] == 200
+    assert me["body"]["email"] == settings.FIRST_SUPERUSER
+    assert read_item["body"] == {"id": str(item.id), "title": item.title}
+    assert "etag" in read_item["headers"]
+    assert notices["status"] == 200
+    assert "count" in notices["body"]
+    assert missing["status"] == 404
+    assert missing["body"] == {"detail": "Item not found"}
+
+
+def test_batch_read_after_write(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    data = {
+        "requests": [
+            {"method": "POST", "path": "/items/", "body": {"title": "Batched"}},
+            {"path": "/items/?limit=1000"},
+        ]
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/batch", headers=normal_user_token_headers, json=data
+    )
+    assert r.status_code == 200
+    created, items = r.json()["responses"]
+    assert created["status"] == 200
+    assert created["body"]["title"] == "Batched"
+    assert created["body"]["id"] in [item["id"] for item in items["body"]["data"]]
+
+
+def test_batch_requires_auth(client: TestClient) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/batch", json={"requests": [{"path": "/users/me"}]}
+    )
+    assert r.status_code == 401
+
+
+def test_batch_not_nested(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = {"requests": [{"method": "POST", "path": "/batch", "body": {}}]}
+    r = client.post(
+        f"{settings.API_V1_STR}/batch", headers=superuser_token_headers, json=data
+    )
+    assert r.status_code == 400
+
+
+def test_batch_too_many_requests(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = {
+        "requests": [{"path": "/users/me"}] * (settings.BATCH_MAX_REQUESTS + 1)
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/batch", headers=superuser_token_headers, json=data
+    )
+    assert r.status_code == 400
@@ -1,10 +1,18 @@
+import json
 import uuid
+from collections.abc import AsyncIterator
+from datetime import datetime
 
+import anyio
+import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, select
 
+from app.api.routes.items import _iter_lines
 from app.core.config import settings
+from app.models import Item
 from app.tests.utils.item import create_random_item
+from app.tests.utils.utils import random_lower_string
 
 
 def test_create_item(
@@ -40,6 +48,43 @@ def test_read_item(
     assert content["owner_id"] == str(item.owner_id)
 
 
+def test_read_item_not_modified(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    url = f"{settings.API_V1_STR}/items/{item.id}"
+    response = client.get(url, headers=superuser_token_headers)
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert response.headers["cache-control"] == "private"
+
+    response = client.get(
+        url,
+        headers={**superuser_token_headers, "If-None-Match": etag.removeprefix("W/")},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.put(url, headers=superuser_token_headers, json={"title": "Updated"})
+    response = client.get(
+        url, headers={**superuser_token_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["title"] == "Updated"
+    assert response.headers["etag"] != etag
+
+
+def test_read_item_not_modified_not_enough_permissions(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/{item.id}",
+        headers={**normal_user_token_headers, "If-None-Match": "*"},
+    )
+    assert response.status_code == 400
+
+
 def test_read_item_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -162,3 +207,260 @@ def test_delete_item_not_enough_permissions(
     assert response.status_code == 400
     content = response.json()
     assert content["detail"] == "Not enough permissions"
+
+
+def test_read_item_changes(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes",
+        headers=superuser_token_headers,
+        params={"since": datetime.now().isoformat()},
+    )
+    assert response.status_code == 200
+    high_water_mark = response.json()["high_water_mark"]
+
+    changed = create_random_item(db)
+    deleted = create_random_item(db)
+    response = client.delete(
+        f"{settings.API_V1_STR}/items/{deleted.id}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+
+    response = client.get(
+        f"{settings.API_V1_STR}/items/changes",
+        headers=superuser_token_headers,
+        params={"since": high_water_mark},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    changed_ids = [item["id"] for item in content["data"]]
+    assert str(changed.id) in changed_ids
+    assert str(deleted.id) not in changed_ids
+    assert str(deleted.id) in content["deleted"]
+
+
+def test_read_item_changes_capped(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "SYNC_MAX_ROWS", 2)
+    monkeypatch.setattr(settings, "SYNC_OVERLAP_SECONDS", 0)
+    url = f"{settings.API_V1_STR}/items/changes"
+    response = client.get(
+        url,
+        headers=normal_user_token_headers,
+        params={"since": datetime.now().isoformat()},
+    )
+    since = response.json()["high_water_mark"]
+    ids = []
+    for n in range(4):
+        response = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": f"Change {n}"},
+        )
+        ids.append(response.json()["id"])
+    client.delete(
+        f"{settings.API_V1_STR}/items/{ids[-1]}", headers=normal_user_token_headers
+    )
+
+    pages = []
+    while True:
+        response = client.get(
+            url, headers=normal_user_token_headers, params={"since": since}
+        )
+        content = response.json()
+        if not content["data"] and not content["deleted"]:
+            break
+        pages.append(content)
+        since = content["high_water_mark"]
+    assert [[item["id"] for item in page["data"]] for page in pages] == [
+        ids[:2],
+        ids[2:3],
+    ]
+    assert [page["deleted"] for page in pages] == [[], ids[3:]]
+
+
+def test_read_item_changes_capped_keeps_ties(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "SYNC_MAX_ROWS", 2)
+    monkeypatch.setattr(settings, "SYNC_OVERLAP_SECONDS", 0)
+    url = f"{settings.API_V1_STR}/items/changes"
+    response = client.get(
+        url,
+        headers=normal_user_token_headers,
+        params={"since": datetime.now().isoformat()},
+    )
+    since = response.json()["high_water_mark"]
+    # Imported in one chunk, so all three share one updated_at
+    body = "\n".join(json.dumps({"title": f"Tie {n}"}) for n in range(3))
+    client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        content=body,
+    )
+
+    response = client.get(
+        url, headers=normal_user_token_headers, params={"since": since}
+    )
+    content = response.json()
+    assert len(content["data"]) == 3
+    response = client.get(
+        url,
+        headers=normal_user_token_headers,
+        params={"since": content["high_water_mark"]},
+    )
+    assert response.json()["data"] == []
+
+
+def test_import_items_ndjson(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    body = "\n".join(
+        [
+            json.dumps({"title": "Imported 1", "description": "first"}),
+            json.dumps({"description": "missing title"}),
+            "not json",
+            json.dumps({"title": "Imported 2"}),
+        ]
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        content=body,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == 2
+    assert content["failed"] == 2
+    assert [error["line"] for error in content["errors"]] == [2, 3]
+
+
+def test_import_items_skips_long_lines(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "ITEM_IMPORT_MAX_LINE_BYTES", 100)
+    body = "\n".join(
+        [
+            json.dumps({"title": "Imported 1"}),
+            json.dumps({"title": "x" * 200}),
+            json.dumps({"title": "Imported 2"}),
+        ]
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        content=body,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == 2
+    assert content["failed"] == 1
+    assert content["errors"] == [{"line": 2, "detail": "Line longer than 100 bytes"}]
+
+
+def test_iter_lines_skips_long_lines_across_chunks(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "ITEM_IMPORT_MAX_LINE_BYTES", 10)
+
+    async def stream() -> AsyncIterator[bytes]:
+        for chunk in (b"short\nlong", b"x" * 20, b"y" * 20, b"z\nok\n", b"x" * 20):
+            yield chunk
+
+    async def collect() -> list[bytes | None]:
+        return [line async for line in _iter_lines(stream())]
+
+    assert anyio.run(collect) == [b"short", None, b"ok", None]
+
+
+def test_import_items_csv(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    title = random_lower_string()
+    body = f'title,description\n{title},"with, comma"\n,no title\n'
+    response = client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        params={"format": "csv"},
+        content=body,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == 1
+    assert content["failed"] == 1
+    item = db.exec(select(Item).where(Item.title == title)).one()
+    assert item.description == "with, comma"
+
+
+def test_import_items_csv_field_count(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    body = "title,description\nonly title\ntoo,many,fields\nok,fine\n"
+    response = client.post(
+        f"{settings.API_V1_STR}/items/import",
+        headers=normal_user_token_headers,
+        params={"format": "csv"},
+        content=body,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["imported"] == 1
+    assert content["errors"] == [
+        {"line": 2, "detail": "Expected 2 fields, got 1"},
+        {"line": 3, "detail": "Expected 2 fields, got 3"},
+    ]
+
+
+def test_export_items(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    exported = next(row for row in rows if row["id"] == str(item.id))
+    assert exported["title"] == item.title
+    assert exported["owner_id"] == str(item.owner_id)
+
+
+def test_export_items_csv_only_own(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/export",
+        headers=normal_user_token_headers,
+        params={"format": "csv"},
+    )
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "title,description,id,owner_id,updated_at"
+    assert str(item.id) not in response.text
+
+
+def test_read_items_sparse_fields(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    create_random_item(db)
+    response = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers=superuser_token_headers,
+        params={"fields": "title"},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] >= 1
+    assert all(set(item) == {"id", "title"} for item in content["data"])
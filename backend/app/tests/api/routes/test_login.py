@@ -1,12 +1,21 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from unittest.mock import patch
 
+import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from httpx import Response
+from sqlmodel import Session, select
 
+from app.api.deps import decode_token
 from app.core.config import settings
+from app.core.db import engine
+from app.core.metrics import metrics
+from app.core.revocation import token_revocations
 from app.core.security import verify_password
 from app.crud import create_user
-from app.models import UserCreate
+from app.models import RefreshToken, RevokedToken, UserCreate
 from app.tests.utils.user import user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 from app.utils import generate_password_reset_token
@@ -22,6 +31,7 @@ def test_get_access_token(client: TestClient) -> None:
     assert r.status_code == 200
     assert "access_token" in tokens
     assert tokens["access_token"]
+    assert tokens["refresh_token"]
 
 
 def test_get_access_token_incorrect_password(client: TestClient) -> None:
@@ -116,3 +126,233 @@ def test_reset_password_invalid_token(
     assert "detail" in response
     assert r.status_code == 400
     assert response["detail"] == "Invalid token"
+
+
+def test_logout(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    other_headers = user_authentication_headers(
+        client=client, email=email, password=password
+    )
+
+    r = client.post(f"{settings.API_V1_STR}/logout", headers=headers)
+    assert r.status_code == 200
+    assert r.json() == {"message": "Logged out"}
+    assert db.get(RevokedToken, decode_token(headers["Authorization"][7:]).jti)
+
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 403
+    assert r.json()["detail"] == "Token has been revoked"
+    # Other sessions of the user stay signed in
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=other_headers)
+    assert r.status_code == 200
+
+
+def test_logout_seen_by_other_workers(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    token_data = decode_token(headers["Authorization"][7:])
+    assert token_data.jti and token_data.exp
+
+    # Revoked through another worker: unknown to this worker's filter until
+    # it refreshes (the background refresher is paused to make that explicit)
+    token_revocations.stop()
+    try:
+        db.add(
+            RevokedToken(
+                jti=token_data.jti, expires_at=datetime.fromtimestamp(token_data.exp)
+            )
+        )
+        db.commit()
+        r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+        assert r.status_code == 200
+        token_revocations.refresh()
+        r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+        assert r.status_code == 403
+    finally:
+        token_revocations.start()
+
+
+def test_refresh_does_not_recount_revocations(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    r = client.post(f"{settings.API_V1_STR}/logout", headers=headers)
+    assert r.status_code == 200
+    token_revocations.stop()
+    try:
+        token_revocations.refresh()
+        bloom = token_revocations._filter
+        assert bloom is not None
+        count = bloom.count
+        # The revocation is inside the overlap of both refreshes
+        token_revocations.refresh()
+        assert bloom.count == count
+    finally:
+        token_revocations.start()
+
+
+def test_reset_password_revokes_tokens(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
+    data = {
+        "new_password": random_lower_string(),
+        "token": generate_password_reset_token(email=email),
+    }
+    r = client.post(f"{settings.API_V1_STR}/reset-password/", json=data)
+    assert r.status_code == 200
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 403
+
+
+def login(client: TestClient, db: Session) -> dict[str, str]:
+    email = random_email()
+    password = random_lower_string()
+    create_user(session=db, user_create=UserCreate(email=email, password=password))
+    r = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={"username": email, "password": password},
+    )
+    tokens: dict[str, str] = r.json()
+    return tokens
+
+
+def test_refresh_token_rotation(client: TestClient, db: Session) -> None:
+    tokens = login(client, db)
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == 200
+    new_tokens = r.json()
+    assert new_tokens["refresh_token"] != tokens["refresh_token"]
+    assert new_tokens["access_token"] != tokens["access_token"]
+    # Same login
+    assert (
+        decode_token(new_tokens["access_token"]).sid
+        == decode_token(tokens["access_token"]).sid
+    )
+    r = client.post(
+        f"{settings.API_V1_STR}/login/test-token",
+        headers={"Authorization": f"Bearer {new_tokens['access_token']}"},
+    )
+    assert r.status_code == 200
+
+
+def test_refresh_token_reuse_ends_login(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 0)
+    tokens = login(client, db)
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    new_refresh_token = r.json()["refresh_token"]
+
+    # The first token again: both it and the one it was exchanged for stop working
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid refresh token"
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": new_refresh_token},
+    )
+    assert r.status_code == 400
+    sid = decode_token(tokens["access_token"]).sid
+    assert not db.exec(select(RefreshToken).where(RefreshToken.family_id == sid)).all()
+
+
+def test_concurrent_refreshes_keep_login(client: TestClient, db: Session) -> None:
+    tokens = login(client, db)
+    sid = decode_token(tokens["access_token"]).sid
+
+    def refresh() -> Response:
+        return client.post(
+            f"{settings.API_V1_STR}/login/refresh-token",
+            json={"refresh_token": tokens["refresh_token"]},
+        )
+
+    # Hold the row so that both refreshes are waiting on it at once, as when
+    # two tabs refresh together
+    with Session(engine) as lock_session, ThreadPoolExecutor(2) as pool:
+        lock_session.exec(
+            select(RefreshToken)
+            .where(RefreshToken.family_id == sid)
+            .with_for_update()
+        ).one()
+        futures = [pool.submit(refresh) for _ in range(2)]
+        time.sleep(0.5)
+        lock_session.rollback()
+        responses = [future.result() for future in futures]
+
+    assert sorted(r.status_code for r in responses) == [200, 400]
+    winner = next(r for r in responses if r.status_code == 200).json()
+    # The loser did not end the login: the pair issued to the winner works
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": winner["refresh_token"]},
+    )
+    assert r.status_code == 200
+
+
+def test_refresh_token_expired(client: TestClient, db: Session) -> None:
+    tokens = login(client, db)
+    sid = decode_token(tokens["access_token"]).sid
+    db_token = db.exec(select(RefreshToken).where(RefreshToken.family_id == sid)).one()
+    db_token.expires_at = datetime.now() - timedelta(seconds=1)
+    db.add(db_token)
+    db.commit()
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == 400
+
+
+def test_logout_ends_refresh_token(client: TestClient, db: Session) -> None:
+    tokens = login(client, db)
+    r = client.post(
+        f"{settings.API_V1_STR}/logout",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert r.status_code == 200
+    r = client.post(
+        f"{settings.API_V1_STR}/login/refresh-token",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert r.status_code == 400
+
+
+def test_verified_token_cache(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    checks = metrics.verified_token_cache
+    hits = checks.value(("hit",))
+    for _ in range(2):
+        r = client.post(
+            f"{settings.API_V1_STR}/login/test-token", headers=superuser_token_headers
+        )
+        assert r.status_code == 200
+    assert checks.value(("hit",)) >= hits + 2
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics", headers=superuser_token_headers
+    )
+    assert "verified_token_cache_hit_ratio" in r.text
+
+    # A tampered token is never served from the cache
+    r = client.post(
+        f"{settings.API_V1_STR}/login/test-token",
+        headers={"Authorization": superuser_token_headers["Authorization"] + "x"},
+    )
+    assert r.status_code == 403
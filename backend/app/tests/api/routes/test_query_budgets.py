@@ -0,0 +1,355 @@
+import uuid
+from collections.abc import Callable, Generator
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app import crud, jobs
+from app.core.config import settings
+from app.jobs import run_user_deletion
+from app.models import Item, Notice, Rule, User, UserCreate, UserDeletionJob
+from app.tests.utils.user import create_random_user, user_authentication_headers
+from app.tests.utils.utils import random_email
+from app.utils import generate_password_reset_token
+
+ROWS = 5
+PASSWORD = "budget-password"
+
+
+@pytest.fixture(scope="module")
+def ids(client: TestClient, db: Session) -> dict[str, Any]:
+    """
+    Rows owned by the superuser, enough of each for N+1 patterns to show, and
+    throwaway users and credentials for the routes that change or remove
+    users. Deleting routes get rows of their own, so no case depends on the
+    order of the table.
+    """
+    user = db.exec(select(User).where(User.email == settings.FIRST_SUPERUSER)).one()
+    items = [Item(title=f"budget {i}", owner_id=user.id) for i in range(ROWS)]
+    notices = [
+        Notice(title=f"budget {i}", notice_type="notification", user_id=user.id)
+        for i in range(ROWS)
+    ]
+    rules = [
+        Rule(name=f"budget {i}", owner=user.email, owner_id=user.id)
+        for i in range(ROWS)
+    ]
+    deleted_item = Item(title="budget deleted", owner_id=user.id)
+    deleted_notice = Notice(
+        title="budget deleted", notice_type="notification", user_id=user.id
+    )
+    deleted_rules = [
+        Rule(name=f"budget deleted {i}", owner=user.email, owner_id=user.id)
+        for i in range(ROWS)
+    ]
+    job = UserDeletionJob(user_id=user.id, status="completed")
+    db.add_all(
+        [*items, *notices, *rules, deleted_item, deleted_notice, *deleted_rules, job]
+    )
+    db.commit()
+    other = create_random_user(db)
+    deleted_user = create_random_user(db)
+    reset_user = create_random_user(db)
+    login = client.post(
+        f"{settings.API_V1_STR}/login/access-token",
+        data={
+            "username": settings.FIRST_SUPERUSER,
+            "password": settings.FIRST_SUPERUSER_PASSWORD,
+        },
+    )
+    return {
+        "user": user.id,
+        "other": other.id,
+        "deleted_user": deleted_user.id,
+        "new_email": random_email(),
+        "signup_email": random_email(),
+        "private_email": random_email(),
+        "reset_token": generate_password_reset_token(email=reset_user.email),
+        "refresh_token": login.json()["refresh_token"],
+        "job": job.id,
+        "item": items[0].id,
+        "items": [item.id for item in items],
+        "notice": notices[0].id,
+        "notices": [notice.id for notice in notices],
+        "rule": rules[0].id,
+        "rules": [rule.id for rule in rules],
+        "deleted_item": deleted_item.id,
+        "deleted_notice": deleted_notice.id,
+        "deleted_rules": [rule.id for rule in deleted_rules],
+    }
+
+
+@pytest.fixture(autouse=True)
+def deferred_user_deletions(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[None, None, None]:
+    """
+    The TestClient runs background tasks inside the request, so the deletion
+    job started by ``DELETE /users/...`` would count against the request's
+    budget. Jobs are collected instead and run after the test;
+    ``test_user_deletion_job_budget`` budgets them.
+    """
+    job_ids: list[uuid.UUID] = []
+    monkeypatch.setattr(jobs, "run_user_deletion", job_ids.append)
+    yield
+    for job_id in job_ids:
+        run_user_deletion(job_id)
+
+
+# (method, path, budget, body) of every API route, run as the superuser;
+# paths and bodies are formatted with ids, and a string body is sent as is
+# rather than as JSON. Budgets include the user lookup done by
+# get_current_user. List routes run with several rows present, so a lazy
+# relationship load per row (Item.owner, User.items) blows the budget.
+#
+# Not covered: /password-recovery/{email}, /password-recovery-html-content/
+# {email} and /utils/test-email/ send or render emails, which needs an SMTP
+# server and the built email templates; each only looks up the user.
+BUDGETS: list[tuple[str, str, int, Any]] = [
+    ("POST", "/login/test-token", 1, None),
+    ("GET", "/users/me", 1, None),
+    ("GET", "/users/", 3, None),
+    ("GET", "/users/{user}", 1, None),
+    ("POST", "/users/", 4, {"email": "{new_email}", "password": PASSWORD}),
+    ("PATCH", "/users/{other}", 4, {"full_name": "Budget"}),
+    ("DELETE", "/users/{deleted_user}", 7, None),
+    ("GET", "/users/export", 2, None),
+    ("GET", "/users/deletion-jobs/{job}", 2, None),
+    ("GET", "/items/", 3, None),
+    ("GET", "/items/{item}", 2, None),
+    ("GET", "/items/changes?since={since}", 3, None),
+    ("GET", "/items/export", 2, None),
+    ("POST", "/items/", 3, {"title": "Budget"}),
+    ("POST", "/items/import", 3, '{"title": "Budget 1"}\n{"title": "Budget 2"}'),
+    ("PUT", "/items/{item}", 4, {"title": "Budget"}),
+    ("DELETE", "/items/{deleted_item}", 4, None),
+    ("GET", "/notices", 3, None),
+    ("GET", "/notices/{notice}", 2, None),
+    ("GET", "/notices/changes?since={since}", 3, None),
+    ("POST", "/notices", 3, {"title": "Budget", "notice_type": "notification"}),
+    ("DELETE", "/notices/{deleted_notice}", 4, None),
+    # Includes the SET LOCAL of the route's statement timeout
+    ("GET", "/rule", 4, None),
+    ("GET", "/rule/{rule}", 2, None),
+    ("GET", "/rule/changes?since={since}", 3, None),
+    ("POST", "/rule/{rule}/call", 2, None),
+    ("POST", "/rule", 3, {"method": "post", "name": "Budget"}),
+    ("POST", "/rule", 4, {"method": "update", "key": "{rule}", "name": "Budget"}),
+    ("POST", "/rule", 5, {"method": "delete", "key": "{deleted_rules}"}),
+    ("PATCH", "/rule/batch", 2, {"ids": "{rules}", "status": 1}),
+    (
+        "POST",
+        "/batch",
+        6,
+        {"requests": [{"path": "/users/me"}, {"path": "/items/"}, {"path": "/rule"}]},
+    ),
+    ("GET", "/chart_data", 0, None),
+    ("GET", "/fake_analysis_chart_data", 0, None),
+    ("GET", "/activities", 0, None),
+    ("GET", "/utils/health-check/", 0, None),
+    ("GET", "/utils/metrics", 1, None),
+    ("GET", "/utils/slow-queries", 1, None),
+]
+
+# Routes acting on the caller's own account, each run as a new user
+USER_BUDGETS: list[tuple[str, str, int, Any]] = [
+    ("PATCH", "/users/me", 3, {"full_name": "Budget"}),
+    (
+        "PATCH",
+        "/users/me/password",
+        2,
+        {"current_password": PASSWORD, "new_password": f"new-{PASSWORD}"},
+    ),
+    ("DELETE", "/users/me", 6, None),
+    ("POST", "/logout", 4, None),
+]
+
+# Routes called without a token: (method, path, budget, request arguments)
+ANONYMOUS_BUDGETS: list[tuple[str, str, int, dict[str, Any]]] = [
+    (
+        "POST",
+        "/login/access-token",
+        3,
+        {
+            "data": {
+                "username": settings.FIRST_SUPERUSER,
+                "password": settings.FIRST_SUPERUSER_PASSWORD,
+            }
+        },
+    ),
+    ("POST", "/login/refresh-token", 5, {"json": {"refresh_token": "{refresh_token}"}}),
+    (
+        "POST",
+        "/reset-password/",
+        2,
+        {"json": {"token": "{reset_token}", "new_password": PASSWORD}},
+    ),
+    (
+        "POST",
+        "/users/signup",
+        3,
+        {"json": {"email": "{signup_email}", "password": PASSWORD}},
+    ),
+    (
+        "POST",
+        "/private/users/",
+        2,
+        {
+            "json": {
+                "email": "{private_email}",
+                "password": PASSWORD,
+                "full_name": "Budget",
+            }
+        },
+    ),
+]
+
+
+def _format(value: Any, ids: dict[str, Any]) -> Any:
+    if isinstance(value, dict):
+        return {key: _format(item, ids) for key, item in value.items()}
+    if isinstance(value, str) and value.startswith("{") and value.endswith("}"):
+        found = ids[value[1:-1]]
+        return [str(i) for i in found] if isinstance(found, list) else str(found)
+    if isinstance(value, str):
+        return value.format(**ids)
+    return value
+
+
+def _request_args(body: Any, ids: dict[str, Any]) -> dict[str, Any]:
+    if isinstance(body, str):
+        return {"content": body}
+    return {"json": _format(body, ids)}
+
+
+@pytest.fixture
+def user_headers(client: TestClient, db: Session) -> dict[str, str]:
+    """
+    Token of a new user, for the routes that change or delete their caller.
+    """
+    email = random_email()
+    crud.create_user(session=db, user_create=UserCreate(email=email, password=PASSWORD))
+    return user_authentication_headers(client=client, email=email, password=PASSWORD)
+
+
+def _check_budget(
+    client: TestClient,
+    max_queries: Callable[..., Any],
+    method: str,
+    path: str,
+    budget: int,
+    ids: dict[str, Any],
+    **kwargs: Any,
+) -> None:
+    url = settings.API_V1_STR + path.format(**ids, since="2000-01-01T00:00:00")
+    with max_queries(budget, f"{method} {path}"):
+        r = client.request(method, url, **kwargs)
+    assert r.status_code < 400, r.text
+
+
+@pytest.mark.parametrize(
+    "method,path,budget,body",
+    BUDGETS,
+    ids=[f"{method} {path}" for method, path, _, body in BUDGETS],
+)
+def test_query_budget(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    ids: dict[str, Any],
+    max_queries: Callable[..., Any],
+    method: str,
+    path: str,
+    budget: int,
+    body: Any,
+) -> None:
+    _check_budget(
+        client,
+        max_queries,
+        method,
+        path,
+        budget,
+        ids,
+        headers=superuser_token_headers,
+        **_request_args(body, ids),
+    )
+
+
+@pytest.mark.parametrize(
+    "method,path,budget,body",
+    USER_BUDGETS,
+    ids=[f"{method} {path}" for method, path, _, body in USER_BUDGETS],
+)
+def test_query_budget_own_account(
+    client: TestClient,
+    user_headers: dict[str, str],
+    ids: dict[str, Any],
+    max_queries: Callable[..., Any],
+    method: str,
+    path: str,
+    budget: int,
+    body: Any,
+) -> None:
+    _check_budget(
+        client,
+        max_queries,
+        method,
+        path,
+        budget,
+        ids,
+        headers=user_headers,
+        **_request_args(body, ids),
+    )
+
+
+@pytest.mark.parametrize(
+    "method,path,budget,arguments",
+    ANONYMOUS_BUDGETS,
+    ids=[f"{method} {path}" for method, path, _, arguments in ANONYMOUS_BUDGETS],
+)
+def test_query_budget_anonymous(
+    client: TestClient,
+    ids: dict[str, Any],
+    max_queries: Callable[..., Any],
+    method: str,
+    path: str,
+    budget: int,
+    arguments: dict[str, Any],
+) -> None:
+    _check_budget(
+        client, max_queries, method, path, budget, ids, **_format(arguments, ids)
+    )
+
+
+def test_user_deletion_job_budget(
+    db: Session, max_queries: Callable[..., Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+    The deletion job runs a fixed number of statements per chunk, however
+    many rows each chunk holds.
+    """
+    monkeypatch.setattr(settings, "USER_DELETION_CHUNK_SIZE", 2)
+    user = create_random_user(db)
+    db.add_all(
+        [Item(title=f"budget {i}", owner_id=user.id) for i in range(ROWS)]
+        + [
+            Notice(title=f"budget {i}", notice_type="notification", user_id=user.id)
+            for i in range(ROWS)
+        ]
+        + [
+            Rule(name=f"budget {i}", owner=user.email, owner_id=user.id)
+            for i in range(ROWS)
+        ]
+    )
+    job = UserDeletionJob(user_id=user.id)
+    db.add(job)
+    db.commit()
+    # Chunks of 2 out of 5 rows, for each of the three tables
+    chunks = 3 * 3
+    # Per chunk: delete, tombstones, progress, reloading the job; plus claiming
+    # the job and deleting the user
+    with max_queries(4 * chunks + 7, "user deletion job", requests_only=False):
+        run_user_deletion(job.id)
+    db.refresh(job)
+    assert job.status == "completed"
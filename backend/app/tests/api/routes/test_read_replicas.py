@@ -0,0 +1,100 @@
+from collections.abc import Generator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.engine import Engine
+from sqlmodel import create_engine
+
+from app.api import deps
+from app.core import db as core_db
+from app.core.config import settings
+from app.core.db import RecentWriters
+from app.tests.utils.queries import count_queries
+
+
+@pytest.fixture
+def replica(monkeypatch: pytest.MonkeyPatch) -> Generator[Engine, None, None]:
+    # A second engine on the same database stands in for a replica
+    replica = create_engine(settings.SQLALCHEMY_DATABASE_URI)
+    monkeypatch.setattr(core_db, "replica_engines", [replica])
+    monkeypatch.setattr(deps, "recent_writers", RecentWriters(window=60))
+    yield replica
+    replica.dispose()
+
+
+def test_reads_use_replica_writes_use_primary(
+    client: TestClient, normal_user_token_headers: dict[str, str], replica: Engine
+) -> None:
+    with count_queries(replica) as replica_queries:
+        r = client.get(
+            f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+        )
+    assert r.status_code == 200
+    assert len(replica_queries) > 0
+
+    with count_queries(replica) as replica_queries:
+        r = client.post(
+            f"{settings.API_V1_STR}/items/",
+            headers=normal_user_token_headers,
+            json={"title": "Primary"},
+        )
+    assert r.status_code == 200
+    assert len(replica_queries) == 0
+
+
+def test_read_your_writes(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    superuser_token_headers: dict[str, str],
+    replica: Engine,
+) -> None:
+    r = client.post(
+        f"{settings.API_V1_STR}/items/",
+        headers=normal_user_token_headers,
+        json={"title": "Sticky"},
+    )
+    assert r.status_code == 200
+    item_id = r.json()["id"]
+
+    with count_queries(replica) as replica_queries:
+        r = client.get(
+            f"{settings.API_V1_STR}/items/{item_id}", headers=normal_user_token_headers
+        )
+    assert r.status_code == 200
+    assert len(replica_queries) == 0
+
+    # Other clients keep reading from the replica
+    with count_queries(replica) as replica_queries:
+        client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    assert len(replica_queries) > 0
+
+
+def test_batch_of_reads_keeps_replica(
+    client: TestClient, normal_user_token_headers: dict[str, str], replica: Engine
+) -> None:
+    batch = {"requests": [{"path": "/users/me"}, {"path": "/items/"}]}
+    with count_queries(replica) as replica_queries:
+        r = client.post(
+            f"{settings.API_V1_STR}/batch",
+            headers=normal_user_token_headers,
+            json=batch,
+        )
+    assert r.status_code == 200
+    assert len(replica_queries) > 0
+
+    # Nothing was written, so the client's next reads stay on the replica
+    with count_queries(replica) as replica_queries:
+        client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert len(replica_queries) > 0
+
+    # A write sub-request does make the client a recent writer
+    batch = {
+        "requests": [{"method": "POST", "path": "/items/", "body": {"title": "B"}}]
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/batch", headers=normal_user_token_headers, json=batch
+    )
+    assert r.json()["responses"][0]["status"] == 200
+    with count_queries(replica) as replica_queries:
+        client.get(f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers)
+    assert len(replica_queries) == 0
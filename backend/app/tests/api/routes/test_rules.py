@@ -0,0 +1,261 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from app.api.routes.rules import READ_RULES_STATEMENT_TIMEOUT_MS
+from app.core.config import settings
+from app.core.counters import rule_counters
+from app.models import RulePublic, User
+from app.tests.utils.queries import count_queries
+from app.tests.utils.rule import create_random_rule
+from app.tests.utils.user import authentication_token_from_email
+
+
+def test_record_rule_call(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    rule = create_random_rule(db)
+    for _ in range(3):
+        response = client.post(
+            f"{settings.API_V1_STR}/rule/{rule.id}/call",
+            headers=superuser_token_headers,
+        )
+        assert response.status_code == 202
+
+    response = client.get(
+        f"{settings.API_V1_STR}/rule/{rule.id}",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["call_no"] == 3
+
+    rule_counters.flush()
+    db.refresh(rule)
+    assert rule.call_no == 3
+    assert rule_counters.pending(rule.id) == {"call_no": 0, "progress": 0}
+
+    response = client.get(
+        f"{settings.API_V1_STR}/rule/{rule.id}",
+        headers=superuser_token_headers,
+    )
+    assert response.json()["call_no"] == 3
+
+
+def test_read_rule_not_modified(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    rule = create_random_rule(db)
+    url = f"{settings.API_V1_STR}/rule/{rule.id}"
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "private"
+    etag = response.headers["etag"]
+
+    response = client.get(
+        url, headers={**superuser_token_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    # A buffered call changes the representation before it reaches the database
+    client.post(f"{url}/call", headers=superuser_token_headers)
+    response = client.get(
+        url, headers={**superuser_token_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    rule_counters.flush()
+
+
+def test_read_rule_invalid_id(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    for headers in ({}, {"If-None-Match": '"x"'}):
+        response = client.get(
+            f"{settings.API_V1_STR}/rule/not-a-uuid",
+            headers={**superuser_token_headers, **headers},
+        )
+        assert response.status_code == 422
+
+
+def test_record_rule_call_caps_progress(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    rule = create_random_rule(db)
+    url = f"{settings.API_V1_STR}/rule/{rule.id}"
+    for _ in range(2):
+        response = client.post(
+            f"{url}/call", headers=superuser_token_headers, params={"progress": 60}
+        )
+        assert response.status_code == 202
+
+    response = client.get(url, headers=superuser_token_headers)
+    assert response.json()["progress"] == 100
+
+    rule_counters.flush()
+    db.refresh(rule)
+    assert rule.progress == 100
+
+
+def test_record_rule_call_checks_rule(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    superuser_token_headers: dict[str, str],
+    db: Session,
+) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/rule/{uuid.uuid4()}/call",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
+
+    rule = create_random_rule(db)
+    response = client.post(
+        f"{settings.API_V1_STR}/rule/{rule.id}/call",
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not enough permissions"
+
+    for progress in (-1, 101):
+        response = client.post(
+            f"{settings.API_V1_STR}/rule/{rule.id}/call",
+            headers=superuser_token_headers,
+            params={"progress": progress},
+        )
+        assert response.status_code == 422
+    assert rule_counters.pending(rule.id) == {"call_no": 0, "progress": 0}
+
+
+def test_rule_counters_flush_failure_keeps_deltas(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    rule = create_random_rule(db)
+    rule_counters.increment(rule.id, call_no=2, progress=5)
+
+    def fail(_params: list[dict[str, Any]]) -> None:
+        raise OperationalError("UPDATE rule", {}, Exception("connection lost"))
+
+    with monkeypatch.context() as patch:
+        patch.setattr(rule_counters, "_write", fail)
+        with pytest.raises(OperationalError):
+            rule_counters.flush()
+    assert rule_counters.pending(rule.id) == {"call_no": 2, "progress": 5}
+
+    rule_counters.flush()
+    db.refresh(rule)
+    assert rule.call_no == 2
+    assert rule.progress == 5
+
+
+def test_read_rule_changes_only_own(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    since = (datetime.now() - timedelta(seconds=1)).isoformat()
+    rule = create_random_rule(db)
+    other_rule = create_random_rule(db)
+    owner = db.get(User, rule.owner_id)
+    assert owner
+    headers = authentication_token_from_email(client=client, email=owner.email, db=db)
+    url = f"{settings.API_V1_STR}/rule/changes"
+
+    response = client.get(url, headers=headers, params={"since": since})
+    assert response.status_code == 200
+    assert [r["id"] for r in response.json()["data"]] == [str(rule.id)]
+
+    response = client.get(url, headers=superuser_token_headers, params={"since": since})
+    changed_ids = {r["id"] for r in response.json()["data"]}
+    assert {str(rule.id), str(other_rule.id)} <= changed_ids
+
+
+def test_batch_update_rules(client: TestClient, db: Session) -> None:
+    rule = create_random_rule(db)
+    other_rule = create_random_rule(db)
+    updated_at = rule.updated_at
+    owner = db.get(User, rule.owner_id)
+    assert owner
+    headers = authentication_token_from_email(client=client, email=owner.email, db=db)
+
+    data = {"ids": [str(rule.id), str(other_rule.id)], "status": 2, "progress": 40}
+    response = client.patch(
+        f"{settings.API_V1_STR}/rule/batch", headers=headers, json=data
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["updated"] == 1
+    assert content["skipped"] == 1
+
+    db.refresh(rule)
+    db.refresh(other_rule)
+    assert rule.status == 2
+    assert rule.progress == 40
+    assert rule.updated_at > updated_at
+    assert other_rule.status == 0
+
+
+def test_batch_update_rules_invalid(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    rule = create_random_rule(db)
+    for patch in ({}, {"status": None}, {"progress": None}, {"progress": 101}):
+        response = client.patch(
+            f"{settings.API_V1_STR}/rule/batch",
+            headers=superuser_token_headers,
+            json={"ids": [str(rule.id)], **patch},
+        )
+        assert response.status_code == 422, patch
+
+    # A null next to a real change leaves that field alone
+    owner = db.get(User, rule.owner_id)
+    assert owner
+    headers = authentication_token_from_email(client=client, email=owner.email, db=db)
+    response = client.patch(
+        f"{settings.API_V1_STR}/rule/batch",
+        headers=headers,
+        json={"ids": [str(rule.id)], "status": 1, "progress": None},
+    )
+    assert response.status_code == 200
+    db.refresh(rule)
+    assert rule.status == 1
+    assert rule.progress == 0
+
+
+def test_read_rules_statement_timeout(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    with count_queries() as counter:
+        response = client.get(
+            f"{settings.API_V1_STR}/rule", headers=superuser_token_headers
+        )
+    assert response.status_code == 200
+    # Applied before the first query of the request's transaction
+    assert counter.statements[0] == (
+        f"SET LOCAL statement_timeout = {READ_RULES_STATEMENT_TIMEOUT_MS}"
+    )
+
+
+def test_read_rules(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    rule = create_random_rule(db)
+    create_random_rule(db)
+    rule_counters.increment(rule.id)
+    response = client.get(
+        f"{settings.API_V1_STR}/rule",
+        headers=superuser_token_headers,
+        params={"name": rule.name, "sorter": '{"name": "descend"}'},
+    )
+    rule_counters.flush()
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 1
+    assert content["success"] is True
+    assert content["data"][0]["id"] == str(rule.id)
+    assert content["data"][0]["call_no"] == 1
+    assert set(content["data"][0]) == set(RulePublic.model_fields)
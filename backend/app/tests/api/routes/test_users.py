@@ -1,13 +1,25 @@
+import json
 import uuid
+from datetime import datetime, timedelta
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 from sqlmodel import Session, select
 
-from app import crud
+from app import crud, jobs
 from app.core.config import settings
 from app.core.security import verify_password
-from app.models import User, UserCreate
+from app.models import (
+    DeletedRecord,
+    Item,
+    Notice,
+    Rule,
+    User,
+    UserCreate,
+    UserDeletionJob,
+)
+from app.tests.utils.item import create_random_item
+from app.tests.utils.user import create_random_user, user_authentication_headers
 from app.tests.utils.utils import random_email, random_lower_string
 
 
@@ -22,6 +34,27 @@ def test_get_users_superuser_me(
     assert current_user["email"] == settings.FIRST_SUPERUSER
 
 
+def test_get_users_me_not_modified(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    url = f"{settings.API_V1_STR}/users/me"
+    r = client.get(url, headers=normal_user_token_headers)
+    etag = r.headers["etag"]
+    assert r.headers["cache-control"] == "private"
+
+    r = client.get(url, headers={**normal_user_token_headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+
+    # A sparse fieldset is a different representation
+    r = client.get(
+        f"{url}?fields=email",
+        headers={**normal_user_token_headers, "If-None-Match": etag},
+    )
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+
+
 def test_get_users_normal_user_me(
     client: TestClient, normal_user_token_headers: dict[str, str]
 ) -> None:
@@ -191,43 +224,40 @@ def test_update_user_me(
     assert user_db.full_name == full_name
 
 
-def test_update_password_me(
-    client: TestClient, superuser_token_headers: dict[str, str], db: Session
-) -> None:
+def test_update_password_me(client: TestClient, db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    crud.create_user(session=db, user_create=UserCreate(email=email, password=password))
+    headers = user_authentication_headers(client=client, email=email, password=password)
     new_password = random_lower_string()
     data = {
-        "current_password": settings.FIRST_SUPERUSER_PASSWORD,
+        "current_password": password,
         "new_password": new_password,
     }
     r = client.patch(
         f"{settings.API_V1_STR}/users/me/password",
-        headers=superuser_token_headers,
+        headers=headers,
         json=data,
     )
     assert r.status_code == 200
     updated_user = r.json()
     assert updated_user["message"] == "Password updated successfully"
 
-    user_query = select(User).where(User.email == settings.FIRST_SUPERUSER)
+    user_query = select(User).where(User.email == email)
     user_db = db.exec(user_query).first()
     assert user_db
-    assert user_db.email == settings.FIRST_SUPERUSER
+    assert user_db.email == email
     assert verify_password(new_password, user_db.hashed_password)
 
-    # Revert to the old password to keep consistency in test
-    old_data = {
-        "current_password": new_password,
-        "new_password": settings.FIRST_SUPERUSER_PASSWORD,
-    }
-    r = client.patch(
-        f"{settings.API_V1_STR}/users/me/password",
-        headers=superuser_token_headers,
-        json=old_data,
+    # Tokens issued before the change are revoked, new ones work
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
+    assert r.status_code == 403
+    assert r.json()["detail"] == "Token has been revoked"
+    headers = user_authentication_headers(
+        client=client, email=email, password=new_password
     )
-    db.refresh(user_db)
-
+    r = client.get(f"{settings.API_V1_STR}/users/me", headers=headers)
     assert r.status_code == 200
-    assert verify_password(settings.FIRST_SUPERUSER_PASSWORD, user_db.hashed_password)
 
 
 def test_update_password_me_incorrect_password(
@@ -402,9 +432,9 @@ def test_delete_user_me(client: TestClient, db: Session) -> None:
         f"{settings.API_V1_STR}/users/me",
         headers=headers,
     )
-    assert r.status_code == 200
+    assert r.status_code == 202
     deleted_user = r.json()
-    assert deleted_user["message"] == "User deleted successfully"
+    assert deleted_user["message"] == "User deletion scheduled"
     result = db.exec(select(User).where(User.id == user_id)).first()
     assert result is None
 
@@ -437,13 +467,82 @@ def test_delete_user_super_user(
         f"{settings.API_V1_STR}/users/{user_id}",
         headers=superuser_token_headers,
     )
-    assert r.status_code == 200
+    assert r.status_code == 202
     deleted_user = r.json()
-    assert deleted_user["message"] == "User deleted successfully"
+    assert deleted_user["message"] == "User deletion scheduled"
     result = db.exec(select(User).where(User.id == user_id)).first()
     assert result is None
 
 
+def test_delete_user_with_owned_data(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user = create_random_user(db)
+    user_id = user.id
+    for i in range(3):
+        db.add(Item(title=f"item {i}", owner_id=user_id))
+    db.add(Notice(title="notice", notice_type="notification", user_id=user_id))
+    db.add(Rule(name="rule", owner=user.email, owner_id=user_id))
+    db.commit()
+
+    with patch("app.core.config.settings.USER_DELETION_CHUNK_SIZE", 2):
+        r = client.delete(
+            f"{settings.API_V1_STR}/users/{user_id}",
+            headers=superuser_token_headers,
+        )
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+
+    r = client.get(
+        f"{settings.API_V1_STR}/users/deletion-jobs/{job_id}",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    job = r.json()
+    assert job["status"] == "completed"
+    assert job["items_deleted"] == 3
+    assert job["notices_deleted"] == 1
+    assert job["rules_deleted"] == 1
+    assert db.exec(select(User).where(User.id == user_id)).first() is None
+    # Delta-sync clients learn about the deleted rows
+    tombstones = db.exec(
+        select(DeletedRecord.table_name).where(DeletedRecord.owner_id == user_id)
+    ).all()
+    assert sorted(tombstones) == ["item"] * 3 + ["notice", "rule"]
+
+
+def test_delete_user_twice_reuses_job(db: Session) -> None:
+    user = create_random_user(db)
+    job = jobs.start_user_deletion(session=db, user=user)
+    assert jobs.start_user_deletion(session=db, user=user).id == job.id
+    jobs.run_user_deletion(job.id)
+    db.refresh(job)
+    assert job.status == "completed"
+
+
+def test_resume_user_deletions(db: Session) -> None:
+    user = create_random_user(db)
+    user_id = user.id
+    db.add(Item(title="item", owner_id=user_id))
+    # One job lost with its worker mid-run, one running elsewhere right now
+    stale = datetime.now() - jobs.STALE_JOB_AFTER - timedelta(seconds=1)
+    lost = UserDeletionJob(user_id=user_id, status="running", updated_at=stale)
+    other_user = create_random_user(db)
+    live = UserDeletionJob(user_id=other_user.id, status="running")
+    db.add_all([lost, live])
+    db.commit()
+
+    jobs.resume_user_deletions()
+    db.refresh(lost)
+    db.refresh(live)
+    assert lost.status == "completed"
+    assert lost.items_deleted == 1
+    assert db.get(User, user_id) is None
+    assert live.status == "running"
+    db.delete(live)
+    db.commit()
+
+
 def test_delete_user_not_found(
     client: TestClient, superuser_token_headers: dict[str, str]
 ) -> None:
@@ -484,3 +583,57 @@ def test_delete_user_without_privileges(
     )
     assert r.status_code == 403
     assert r.json()["detail"] == "The user doesn't have enough privileges"
+
+
+def test_export_users_with_usage(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    item = create_random_item(db)
+    db.add(Item(title="second", owner_id=item.owner_id))
+    db.add(Rule(name="rule", owner="owner", owner_id=item.owner_id))
+    db.commit()
+    r = client.get(
+        f"{settings.API_V1_STR}/users/export",
+        headers=superuser_token_headers,
+    )
+    assert r.status_code == 200
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    exported = next(row for row in rows if row["id"] == str(item.owner_id))
+    assert exported["item_count"] == 2
+    assert exported["rule_count"] == 1
+    assert exported["notice_count"] == 0
+    assert "hashed_password" not in exported
+
+
+def test_export_users_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/export",
+        headers=normal_user_token_headers,
+    )
+    assert r.status_code == 403
+
+
+def test_get_users_me_sparse_fields(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me",
+        headers=normal_user_token_headers,
+        params={"fields": "avatar,full_name"},
+    )
+    assert r.status_code == 200
+    assert set(r.json()) == {"id", "avatar", "full_name"}
+
+
+def test_get_users_me_unknown_field(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/users/me",
+        headers=normal_user_token_headers,
+        params={"fields": "email,hashed_password"},
+    )
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Unknown fields: hashed_password"
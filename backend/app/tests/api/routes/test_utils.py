@@ -0,0 +1,136 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, text
+
+from app.core.config import settings
+from app.core.db import engine, set_statement_timeout
+from app.core.slow_queries import slow_queries
+
+
+def test_read_metrics(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    client.get(f"{settings.API_V1_STR}/users/me", headers=superuser_token_headers)
+    client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    client.get(f"{settings.API_V1_STR}/no-such-route")
+
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/metrics", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert (
+        'http_request_duration_seconds_bucket{route="users-read_user_me",le="+Inf"}'
+        in text
+    )
+    assert 'http_requests_total{route="users-read_user_me",status="200"}' in text
+    assert 'http_requests_total{route="unmatched",status="404"}' in text
+    # Listing items counts the rows and reads a page
+    assert 'db_queries_total{route="items-read_items"}' in text
+    assert f"threadpool_tokens_total {settings.THREADPOOL_TOKENS}" in text
+    assert "# TYPE threadpool_wait_seconds gauge" in text
+    # The scrape itself is in flight while it renders
+    assert "http_requests_in_flight 1" in text
+
+
+def test_read_metrics_needs_scrape_token_or_superuser(
+    client: TestClient,
+    normal_user_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    url = f"{settings.API_V1_STR}/utils/metrics"
+    r = client.get(url)
+    assert r.status_code == 401
+    r = client.get(url, headers=normal_user_token_headers)
+    assert r.status_code == 403
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+    r = client.get(url, headers={"Authorization": "Bearer scrape-token"})
+    assert r.status_code == 200
+    assert "# TYPE http_requests_total counter" in r.text
+    r = client.get(url, headers={"Authorization": "Bearer wrong-token"})
+    assert r.status_code == 403
+
+
+def test_server_timing_superuser(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers={**superuser_token_headers, "X-Server-Timing": "1"},
+    )
+    assert r.status_code == 200
+    phases = [entry.split(";")[0] for entry in r.headers["server-timing"].split(", ")]
+    assert phases == ["auth", "user", "db", "app", "total"]
+    assert 'desc="2 queries"' in r.headers["server-timing"]
+
+
+def test_server_timing_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/items/",
+        headers={**normal_user_token_headers, "X-Server-Timing": "1"},
+    )
+    assert r.status_code == 200
+    assert "server-timing" not in r.headers
+
+    r = client.get(
+        f"{settings.API_V1_STR}/items/", headers=normal_user_token_headers
+    )
+    assert "server-timing" not in r.headers
+
+
+def test_statement_timeout_recorded_as_slow_query() -> None:
+    slow_queries.clear()
+    with Session(engine) as session:
+        set_statement_timeout(session, 50)
+        with pytest.raises(OperationalError):
+            session.exec(text("SELECT pg_sleep(1)"))  # type: ignore[call-overload]
+    entry = slow_queries.entries()[0]
+    assert entry["statement"] == "SELECT pg_sleep(1)"
+    assert "statement timeout" in entry["error"]
+    assert entry["plan"] is None
+
+
+def test_read_slow_queries(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    slow_queries.clear()
+    # Keep every statement and explain SELECTs whenever none is in progress
+    monkeypatch.setattr(slow_queries, "threshold", 0.0)
+    monkeypatch.setattr(slow_queries, "sample_rate", 1.0)
+    client.get(f"{settings.API_V1_STR}/items/", headers=superuser_token_headers)
+    monkeypatch.setattr(slow_queries, "threshold", 60.0)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and not any(
+        entry["plan"] for entry in slow_queries.entries()
+    ):
+        time.sleep(0.05)
+
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/slow-queries", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+    content = r.json()
+    assert content["count"] == len(content["data"]) > 0
+    explained = [entry for entry in content["data"] if entry["plan"]]
+    assert explained
+    assert all(entry["statement"].startswith("SELECT") for entry in explained)
+    assert "actual time" in explained[0]["plan"]
+
+
+def test_read_slow_queries_normal_user(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{settings.API_V1_STR}/utils/slow-queries", headers=normal_user_token_headers
+    )
+    assert r.status_code == 403
@@ -1,4 +1,5 @@
-from collections.abc import Generator
+from collections.abc import Callable, Generator
+from typing import Any
 
 import pytest
 from fastapi.testclient import TestClient
@@ -7,7 +8,8 @@ from sqlmodel import Session, delete
 from app.core.config import settings
 from app.core.db import engine, init_db
 from app.main import app
-from app.models import Item, User
+from app.models import DeletedRecord, Item, Notice, Rule, User, UserDeletionJob
+from app.tests.utils.queries import assert_max_queries
 from app.tests.utils.user import authentication_token_from_email
 from app.tests.utils.utils import get_superuser_token_headers
 
@@ -19,8 +21,16 @@ def db() -> Generator[Session, None, None]:
         yield session
         statement = delete(Item)
         session.execute(statement)
+        statement = delete(Notice)
+        session.execute(statement)
+        statement = delete(Rule)
+        session.execute(statement)
         statement = delete(User)
         session.execute(statement)
+        statement = delete(DeletedRecord)
+        session.execute(statement)
+        statement = delete(UserDeletionJob)
+        session.execute(statement)
         session.commit()
 
 
@@ -40,3 +50,12 @@ def normal_user_token_headers(client: TestClient, db: Session) -> dict[str, str]
     return authentication_token_from_email(
         client=client, email=settings.EMAIL_TEST_USER, db=db
     )
+
+
+@pytest.fixture
+def max_queries() -> Callable[..., Any]:
+    """
+    ``with max_queries(3): client.get(...)`` fails the test when the requests
+    made inside the block run more than three queries.
+    """
+    return assert_max_queries
@@ -0,0 +1,96 @@
+import asyncio
+
+import httpx
+from starlette.types import Receive, Scope, Send
+
+from app.core.admission import AdmissionControlMiddleware, AdmissionLimit, route_group
+from app.core.config import settings
+
+API = settings.API_V1_STR
+
+
+def test_route_group() -> None:
+    assert route_group("POST", f"{API}/login/access-token") == "auth"
+    assert route_group("GET", f"{API}/chart_data") == "analytics"
+    assert route_group("GET", f"{API}/items/") == "reads"
+    assert route_group("DELETE", f"{API}/items/1") == "writes"
+    assert route_group("GET", f"{API}/utils/health-check/") is None
+    assert route_group("GET", "/docs") is None
+
+
+def test_limit_queues_then_sheds() -> None:
+    async def scenario() -> None:
+        limit = AdmissionLimit(1, queue_size=1, queue_timeout=0.05)
+        assert await limit.acquire() is None
+        waiting = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        assert limit.queued == 1
+        assert await limit.acquire() == "queue_full"
+        assert await waiting == "queue_timeout"
+        assert limit.queued == 0
+
+        # A released slot goes to the next waiter
+        waiting = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        limit.release(0.01)
+        assert await waiting is None
+        assert limit.in_flight == 1
+        limit.release(0.01)
+        assert limit.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_limit_adapts_to_latency() -> None:
+    async def scenario() -> None:
+        limit = AdmissionLimit(10, 10, 1.0, adaptive=True, target_latency=0.1)
+        await limit.acquire()
+        limit.release(0.5)
+        assert limit.limit == 9
+        # Further slow responses within the same interval count once
+        await limit.acquire()
+        limit.release(0.5)
+        assert limit.limit == 9
+
+        for _ in range(9):
+            await limit.acquire()
+        limit.release(0.01)
+        assert 9 < limit.limit < 10
+
+    asyncio.run(scenario())
+
+
+def test_middleware_rejects_with_retry_after() -> None:
+    release = asyncio.Event()
+
+    async def app(scope: Scope, _receive: Receive, send: Send) -> None:
+        if scope["path"].endswith("/slow"):
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    middleware = AdmissionControlMiddleware(
+        app, limits={"reads": AdmissionLimit(1, queue_size=0, queue_timeout=1.0)}
+    )
+
+    async def scenario() -> None:
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            slow = asyncio.create_task(client.get(f"{API}/slow"))
+            await asyncio.sleep(0.05)
+            r = await client.get(f"{API}/items/")
+            assert r.status_code == 503
+            assert r.headers["retry-after"] == "1"
+            # Health checks and other groups are not held back
+            r = await client.get(f"{API}/utils/health-check/")
+            assert r.status_code == 200
+            r = await client.post(f"{API}/items/")
+            assert r.status_code == 200
+            release.set()
+            assert (await slow).status_code == 200
+            r = await client.get(f"{API}/items/")
+            assert r.status_code == 200
+
+    asyncio.run(scenario())
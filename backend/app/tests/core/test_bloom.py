@@ -0,0 +1,16 @@
+from app.core.bloom import BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    keys = [f"token-{n}" for n in range(1000)]
+    bloom = BloomFilter(1000, 0.01, keys)
+    assert bloom.count == 1000
+    assert all(key in bloom for key in keys)
+
+
+def test_bloom_filter_false_positive_rate() -> None:
+    bloom = BloomFilter(10_000, 0.01, (f"revoked-{n}" for n in range(10_000)))
+    false_positives = sum(f"valid-{n}" in bloom for n in range(100_000))
+    # Expected 1%; allow for variance
+    assert false_positives < 1_500
+    assert 1 not in bloom
@@ -0,0 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.metrics import Counter
+
+
+def test_counter_increments_from_threads() -> None:
+    counter = Counter("test_total", "Test counter.", ("kind",))
+
+    def count() -> None:
+        for _ in range(10_000):
+            counter.inc(("a",))
+
+    with ThreadPoolExecutor(8) as pool:
+        for _ in range(8):
+            pool.submit(count)
+    assert counter.value(("a",)) == 80_000
+    assert counter.value(("b",)) == 0
+    assert counter.collect()[-1] == 'test_total{kind="a"} 80000'
@@ -0,0 +1,30 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+from anyio import to_thread
+
+from app.core.metrics import metrics
+from app.core.threadpool import ThreadpoolProbe
+
+
+def test_probe_warns_when_saturated(caplog: pytest.LogCaptureFixture) -> None:
+    probe = ThreadpoolProbe(interval=1.0, warning_threshold=0.05)
+    unblock = threading.Event()
+
+    async def scenario() -> float:
+        to_thread.current_default_thread_limiter().total_tokens = 1
+        busy = asyncio.create_task(to_thread.run_sync(unblock.wait))
+        await asyncio.sleep(0.01)
+        asyncio.get_running_loop().call_later(0.1, unblock.set)
+        wait = await probe.measure()
+        await busy
+        return wait
+
+    with caplog.at_level(logging.WARNING, logger="app.core.threadpool"):
+        wait = asyncio.run(scenario())
+    assert wait >= 0.05
+    assert metrics.threadpool_wait == wait
+    assert "Threadpool saturated" in caplog.text
+    assert "(1 of 1 busy" in caplog.text
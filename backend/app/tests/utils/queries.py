@@ -0,0 +1,81 @@
+import threading
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.db import engine as default_engine
+from app.core.metrics import current_db_stats
+
+
+class QueryCounter:
+    """
+    SQL statements executed on behalf of API requests while it is active.
+
+    Only statements issued inside a request (as tracked by the metrics
+    middleware) are recorded, so fixtures, test set-up and the background
+    rule-counter flush do not count; ``requests_only=False`` records every
+    statement, e.g. to budget a background job called directly.
+    """
+
+    def __init__(self, requests_only: bool = True) -> None:
+        self.requests_only = requests_only
+        self._lock = threading.Lock()
+        self.statements: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def record(self, statement: str) -> None:
+        if self.requests_only and current_db_stats() is None:
+            return
+        with self._lock:
+            self.statements.append(statement)
+
+    def assert_at_most(self, budget: int, label: str = "block") -> None:
+        if len(self) <= budget:
+            return
+        listing = "\n".join(
+            f"  {number}. {' '.join(statement.split())}"
+            for number, statement in enumerate(self.statements, start=1)
+        )
+        pytest.fail(
+            f"{label} ran {len(self)} queries, budget is {budget}:\n{listing}",
+            pytrace=False,
+        )
+
+
+@contextmanager
+def count_queries(
+    engine: Engine = default_engine, requests_only: bool = True
+) -> Generator[QueryCounter, None, None]:
+    counter = QueryCounter(requests_only)
+
+    def before_cursor_execute(_conn: Any, _cursor: Any, statement: str, *_: Any) -> None:
+        counter.record(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(
+    budget: int,
+    label: str = "block",
+    engine: Engine = default_engine,
+    requests_only: bool = True,
+) -> Generator[QueryCounter, None, None]:
+    """
+    Fail the test, listing every statement, if the block makes API requests
+    (or, with ``requests_only=False``, anything) that run more than ``budget``
+    queries in total.
+    """
+    with count_queries(engine, requests_only) as counter:
+        yield counter
+    counter.assert_at_most(budget, label)
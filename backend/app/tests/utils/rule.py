@@ -0,0 +1,14 @@
+from sqlmodel import Session
+
+from app.models import Rule
+from app.tests.utils.user import create_random_user
+from app.tests.utils.utils import random_lower_string
+
+
+def create_random_rule(db: Session) -> Rule:
+    user = create_random_user(db)
+    rule = Rule(name=random_lower_string(), owner=user.email, owner_id=user.id)
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    return rule
@@ -8,6 +8,7 @@ from app.utils.email import (
     send_email,
     verify_password_reset_token,
 )
+from app.utils.export import ExportFormat, encode_rows, export_response, stream_rows
 
 __all__ = [
     # Email utilities
@@ -18,4 +19,9 @@ __all__ = [
     "generate_reset_password_email",
     "generate_new_account_email",
     "EmailData",
+    # Export utilities
+    "ExportFormat",
+    "encode_rows",
+    "export_response",
+    "stream_rows",
 ]
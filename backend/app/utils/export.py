@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import uuid
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import datetime
+from typing import Any, Literal
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import read_engine
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_MEDIA_TYPES: dict[str, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Cannot export value of type {type(value).__name__}")
+
+
+def stream_rows(statement: Select[Any]) -> Iterator[Sequence[Any]]:
+    """
+    Run a column ``select`` through a server-side cursor and yield its rows.
+
+    The generator owns its session, so it stays open for as long as the
+    response is being streamed rather than for the lifetime of the request's
+    dependencies. Only ``EXPORT_BATCH_SIZE`` rows are held in memory at a time.
+    Exports read from a replica when one is configured.
+    """
+    with Session(read_engine()) as session:
+        result = session.execute(
+            statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        yield from result
+
+
+def encode_rows(
+    rows: Iterable[Sequence[Any]], fields: Sequence[str], format: ExportFormat
+) -> Iterator[bytes]:
+    """
+    Encode rows as NDJSON or CSV, yielding one chunk per ``EXPORT_BATCH_SIZE``
+    rows.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format == "csv" else None
+    if writer:
+        writer.writerow(fields)
+    pending = 0
+    for row in rows:
+        if writer:
+            writer.writerow(
+                v.isoformat() if isinstance(v, datetime) else v for v in row
+            )
+        else:
+            record = dict(zip(fields, row, strict=True))
+            buffer.write(json.dumps(record, default=_json_default))
+            buffer.write("\n")
+        pending += 1
+        if pending >= settings.EXPORT_BATCH_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def export_response(
+    statement: Select[Any],
+    fields: Sequence[str],
+    format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    return StreamingResponse(
+        encode_rows(stream_rows(statement), fields, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{format}"'
+        },
+    )
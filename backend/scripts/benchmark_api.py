@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+End-to-end HTTP load benchmark for the API.
+
+Seeds the database configured in ``.env`` with benchmark users and their
+items, notices and rules through ``seed_db`` (deterministic for a given
+``--seed``), boots the app under uvicorn with N workers and drives each
+scenario with an async httpx client at a fixed concurrency. The results
+(throughput, p50/p90/p99 latency, errors, requests shed with 503) are written
+as JSON so runs can be compared across commits. Everything runs against
+localhost; no network access is needed.
+
+Admission control is switched off in the server unless ``--admission`` is
+given, so the numbers measure the app rather than its concurrency limits.
+
+Usage:
+    python scripts/benchmark_api.py [--scale 100] [--workers 2]
+        [--concurrency 32] [--duration 10] [--output benchmark.json]
+        [--compare previous.json] [--admission]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from seed_db import make_plan, seed_database, user_email  # noqa: E402
+
+BACKEND_DIR = Path(__file__).parent.parent
+BENCH_DOMAIN = "bench.example.com"
+BENCH_PASSWORD = "benchmark-password"
+API = settings.API_V1_STR
+
+# Set to 0 (no limit) unless --admission is given
+ADMISSION_LIMITS = (
+    "ADMISSION_AUTH_LIMIT",
+    "ADMISSION_READS_LIMIT",
+    "ADMISSION_WRITES_LIMIT",
+    "ADMISSION_ANALYTICS_LIMIT",
+)
+
+# name -> (method, path); "login" posts the form instead
+SCENARIOS: dict[str, tuple[str, str]] = {
+    "login_access_token": ("POST", f"{API}/login/access-token"),
+    "read_items": ("GET", f"{API}/items/?limit=100"),
+    "read_rules": ("GET", f"{API}/rule?pageSize=20"),
+    "read_notices": ("GET", f"{API}/notices?limit=20"),
+    "fake_analysis_chart_data": ("GET", f"{API}/fake_analysis_chart_data"),
+    "chart_data": ("GET", f"{API}/chart_data"),
+    "activities": ("GET", f"{API}/activities"),
+}
+
+
+def bench_email(n: int) -> str:
+    return user_email(n, BENCH_DOMAIN)
+
+
+def seed(args: argparse.Namespace) -> int:
+    """
+    Replace earlier benchmark data with ``--scale`` users and a skewed
+    ``--rows-per-user`` average of items, notices and rules each, loaded by
+    ``seed_db``. The same ``--seed`` always produces the same data.
+    """
+    plan = make_plan(
+        users=args.scale,
+        items_per_user=args.rows_per_user,
+        notices_per_user=args.rows_per_user,
+        rules_per_user=args.rows_per_user,
+        alpha=args.alpha,
+        seed=args.seed,
+        domain=BENCH_DOMAIN,
+        password=BENCH_PASSWORD,
+    )
+    return seed_database(plan, workers=args.seed_workers)
+
+
+def start_server(port: int, workers: int, admission: bool) -> subprocess.Popen[bytes]:
+    env = {**os.environ, "PYTHONPATH": str(BACKEND_DIR)}
+    if not admission:
+        env.update(dict.fromkeys(ADMISSION_LIMITS, "0"))
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+
+async def wait_until_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                r = await client.get(f"{API}/utils/health-check/")
+                if r.status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready")
+
+
+async def login(client: httpx.AsyncClient, email: str) -> httpx.Response:
+    return await client.post(
+        f"{API}/login/access-token",
+        data={"username": email, "password": BENCH_PASSWORD},
+    )
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    tokens: list[str],
+    emails: list[str],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+) -> dict[str, Any]:
+    method, path = SCENARIOS[name]
+    latencies: list[float] = []
+    errors = shed = 0
+    measuring = False
+
+    async def worker(n: int) -> None:
+        nonlocal errors, shed
+        rng = random.Random(n)
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                if name == "login_access_token":
+                    r = await login(client, rng.choice(emails))
+                else:
+                    token = tokens[rng.randrange(len(tokens))]
+                    r = await client.request(
+                        method, path, headers={"Authorization": f"Bearer {token}"}
+                    )
+                status = r.status_code
+            except httpx.HTTPError:
+                status = None
+            if measuring:
+                latencies.append(time.perf_counter() - start)
+                # Turned away by admission control, not a failure of the route
+                shed += status == 503
+                errors += status is None or (status >= 400 and status != 503)
+
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(worker(n)) for n in range(concurrency)]
+    await asyncio.sleep(warmup)
+    measuring = True
+    started = time.perf_counter()
+    await asyncio.sleep(duration)
+    measuring = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*tasks)
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "shed": shed,
+        "rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p90_ms": round(percentile(ordered, 90) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    await wait_until_ready(base_url)
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30.0
+    ) as client:
+        emails = [bench_email(n) for n in range(min(args.scale, args.concurrency))]
+        tokens = []
+        for email in emails:
+            r = await login(client, email)
+            r.raise_for_status()
+            tokens.append(r.json()["access_token"])
+
+        results = {}
+        for name in args.scenarios:
+            results[name] = await run_scenario(
+                client,
+                name,
+                tokens,
+                emails,
+                args.concurrency,
+                args.duration,
+                args.warmup,
+            )
+            print(f"{name:<26}{json.dumps(results[name])}")
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict[str, Any], current: dict[str, Any]) -> None:
+    print(f"\n{'scenario':<26}{'rps':>16}{'p50 ms':>18}{'p99 ms':>18}")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        cells = [
+            f"{before[key]} -> {result[key]}" for key in ("rps", "p50_ms", "p99_ms")
+        ]
+        print(f"{name:<26}" + "".join(f"{cell:>18}" for cell in cells))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", type=int, default=100, help="benchmark users")
+    parser.add_argument(
+        "--rows-per-user",
+        type=float,
+        default=50,
+        help="average items, notices and rules each",
+    )
+    parser.add_argument("--alpha", type=float, default=1.5, help="tenant skew")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--seed-workers", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument(
+        "--admission",
+        action="store_true",
+        help="keep the configured admission limits (503s are reported as shed)",
+    )
+    parser.add_argument("--output", type=Path, default=Path("benchmark.json"))
+    parser.add_argument("--compare", type=Path, help="earlier report to diff against")
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        rows = seed(args)
+        print(f"Seeded {rows} rows in {time.perf_counter() - started:.1f}s")
+
+    server = start_server(args.port, args.workers, args.admission)
+    try:
+        scenarios = asyncio.run(run(args))
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            key: getattr(args, key)
+            for key in (
+                "scale",
+                "rows_per_user",
+                "alpha",
+                "seed",
+                "workers",
+                "concurrency",
+                "duration",
+                "warmup",
+                "admission",
+            )
+        },
+        "scenarios": scenarios,
+    }
+    args.output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Report written to {args.output}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
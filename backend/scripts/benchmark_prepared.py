@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the hot queries with and without server-side prepared statements.
+
+Runs the ``get_current_user`` primary-key lookup, ``get_user_by_email`` and
+the item and rule list/count queries against the database configured in
+``.env``, once with preparation disabled (``prepare_threshold=None``, as
+with a transaction-pooling proxy) and once preparing on first use
+(``prepare_threshold=0``), and prints per-query latency. Seed some data
+first (``python seed_db.py``) for realistic plans.
+
+Usage:
+    python scripts/benchmark_prepared.py [--repeat 2000]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlmodel import Session, func, select  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.api.responses import public_columns  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.db import make_engine  # noqa: E402
+from app.models import Item, ItemPublic, Rule, RulePublic, User  # noqa: E402
+
+CONFIGURATIONS: dict[str, int | None] = {
+    "unprepared": None,
+    "prepared": 0,
+}
+
+
+def hot_queries(user: User) -> dict[str, Callable[[Session], Any]]:
+    return {
+        "get_current_user": lambda session: session.get(User, user.id),
+        "get_user_by_email": lambda session: crud.get_user_by_email(
+            session=session, email=user.email
+        ),
+        "read_items count": lambda session: session.exec(
+            select(func.count()).select_from(Item)
+        ).one(),
+        "read_items page": lambda session: session.exec(
+            select(*public_columns(Item, ItemPublic)).offset(0).limit(100)
+        ).all(),
+        "read_rules count": lambda session: session.exec(
+            select(func.count()).select_from(Rule)
+        ).one(),
+        "read_rules page": lambda session: session.exec(
+            select(*public_columns(Rule, RulePublic))
+            .order_by(Rule.created_at.desc())
+            .offset(0)
+            .limit(20)
+        ).all(),
+    }
+
+
+def measure(
+    engine: Engine, query: Callable[[Session], Any], repeat: int
+) -> list[float]:
+    timings = []
+    # A fresh session per call, as per request; the pool hands back the same
+    # connection, so its prepared statements are reused
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            query(session)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=50)
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, list[float]]] = {}
+    for name, threshold in CONFIGURATIONS.items():
+        engine = make_engine(
+            settings.SQLALCHEMY_DATABASE_URI, prepare_threshold=threshold
+        )
+        with Session(engine) as session:
+            user = session.exec(select(User).limit(1)).first()
+            assert user, "Seed the database first"
+            session.expunge(user)
+        for query_name, query in hot_queries(user).items():
+            measure(engine, query, args.warmup)
+            results.setdefault(query_name, {})[name] = measure(
+                engine, query, args.repeat
+            )
+        engine.dispose()
+
+    header = "".join(
+        f"{name + ' p50':>18}{name + ' p99':>18}" for name in CONFIGURATIONS
+    )
+    print(f"{'query (us)':<20}{header}{'speedup':>10}")
+    for query_name, by_config in results.items():
+        cells = ""
+        medians = []
+        for name in CONFIGURATIONS:
+            ordered = sorted(by_config[name])
+            median = statistics.median(ordered) * 1e6
+            p99 = ordered[int(len(ordered) * 0.99) - 1] * 1e6
+            medians.append(median)
+            cells += f"{median:>18.1f}{p99:>18.1f}"
+        print(f"{query_name:<20}{cells}{medians[0] / medians[-1]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark list-endpoint serialisation: FastAPI's default path versus the
+orjson fast path in app.api.responses.
+
+The default path is what a route returning ``ItemsPublic(data=rows, count=n)``
+with ``response_model=ItemsPublic`` costs: building the model, validating it
+again against the response model, dumping it to JSON-compatible Python and
+encoding with the stdlib ``json`` module. No database is needed; rows are
+built in memory.
+
+Usage:
+    python scripts/benchmark_serialization.py [--rows 100] [--repeat 200]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi._compat import ModelField  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from app.api.responses import page_response  # noqa: E402
+from app.models import (  # noqa: E402
+    Item,
+    ItemPublic,
+    ItemsPublic,
+    Notice,
+    NoticePublic,
+    NoticesPublic,
+    Rule,
+    RulePublic,
+    RulesPublic,
+    User,
+    UserPublic,
+    UsersPublic,
+)
+
+
+def make_rows(model: str, n: int) -> list[Any]:
+    owner_id = uuid.uuid4()
+    now = datetime.now()
+    if model == "items":
+        return [
+            Item(title=f"item {i}", description="description", owner_id=owner_id)
+            for i in range(n)
+        ]
+    if model == "users":
+        return [
+            User(
+                email=f"user{i}@example.com",
+                hashed_password="x" * 60,
+                full_name=f"User {i}",
+                avatar="https://example.com/avatar.png",
+                signature="signature",
+                title="title",
+                group="group",
+                country="country",
+                address="address",
+                phone="+1-555-0100",
+            )
+            for i in range(n)
+        ]
+    if model == "notices":
+        return [
+            Notice(
+                title=f"notice {i}",
+                notice_type="notification",
+                user_id=owner_id,
+                created_at=now,
+            )
+            for i in range(n)
+        ]
+    return [
+        Rule(name=f"rule {i}", owner="owner", owner_id=owner_id, created_at=now)
+        for i in range(n)
+    ]
+
+
+ENDPOINTS: dict[str, tuple[type[SQLModel], type[SQLModel]]] = {
+    "items": (ItemsPublic, ItemPublic),
+    "users": (UsersPublic, UserPublic),
+    "notices": (NoticesPublic, NoticePublic),
+    "rules": (RulesPublic, RulePublic),
+}
+
+
+def default_path(field: ModelField, page_model: type[SQLModel], rows: list[Any]) -> bytes:
+    content = page_model(data=rows, count=len(rows))  # type: ignore[call-arg]
+    value, errors = field.validate(content, {}, loc=("response",))
+    assert not errors
+    data = field.serialize(value, mode="json")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def fast_path(public_model: type[SQLModel], rows: list[Any]) -> bytes:
+    return bytes(page_response(rows, public_model, len(rows)).body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<10}{'default (us)':>14}{'orjson (us)':>14}{'speedup':>10}")
+    for name, (page_model, public_model) in ENDPOINTS.items():
+        rows = make_rows(name, args.rows)
+        field = create_model_field(name="Response", type_=page_model, mode="serialization")
+        assert json.loads(default_path(field, page_model, rows))["data"] == json.loads(
+            fast_path(public_model, rows)
+        )["data"]
+        before = min(
+            timeit.repeat(
+                lambda: default_path(field, page_model, rows),  # noqa: B023
+                number=args.repeat,
+                repeat=5,
+            )
+        )
+        after = min(
+            timeit.repeat(
+                lambda: fast_path(public_model, rows),  # noqa: B023
+                number=args.repeat,
+                repeat=5,
+            )
+        )
+        per_call_before = before / args.repeat * 1e6
+        per_call_after = after / args.repeat * 1e6
+        print(
+            f"{name:<10}{per_call_before:>14.1f}{per_call_after:>14.1f}"
+            f"{per_call_before / per_call_after:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Seed the database with synthetic users, items, notices and rules at
+production-like volume.
+
+Rows per user follow a Pareto distribution, so a few heavy tenants own a
+large share of the data. Users are split into chunks that worker processes
+load with ``COPY``, each chunk in its own transaction. Every value (ids,
+timestamps, text, counts) is derived from ``--seed``, so the same arguments
+always produce the same data regardless of the number of workers.
+
+Usage:
+    python seed_db.py --users 100000 --items-per-user 40 --notices-per-user 30 \\
+        --rules-per-user 30 --workers 8
+"""
+
+import argparse
+import logging
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import psycopg
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DOMAIN = "seed.example.com"
+DEFAULT_PASSWORD = "seed-password"
+# Timestamps are spread over the year before this instant
+EPOCH = datetime(2025, 1, 1)
+NOTICE_TYPES = ("notification", "message", "event")
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima "
+    "mike november oscar papa quebec romeo sierra tango uniform victor whiskey"
+).split()
+
+
+@dataclass
+class SeedPlan:
+    seed: int
+    domain: str
+    hashed_password: str
+    # Per user: (items, notices, rules)
+    counts: list[tuple[int, int, int]]
+
+
+def user_email(n: int, domain: str = DEFAULT_DOMAIN) -> str:
+    return f"user{n}@{domain}"
+
+
+def database_dsn() -> str:
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI)).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+def skewed_counts(
+    rng: random.Random, users: int, mean: float, alpha: float
+) -> list[int]:
+    """
+    ``users`` row counts averaging ``mean``, drawn from a Pareto distribution
+    with shape ``alpha`` (smaller is more skewed).
+    """
+    if users == 0 or mean == 0:
+        return [0] * users
+    weights = [rng.paretovariate(alpha) for _ in range(users)]
+    scale = mean * users / sum(weights)
+    return [int(weight * scale) for weight in weights]
+
+
+def make_plan(
+    *,
+    users: int,
+    items_per_user: float,
+    notices_per_user: float,
+    rules_per_user: float,
+    alpha: float,
+    seed: int,
+    domain: str,
+    password: str,
+) -> SeedPlan:
+    rng = random.Random(seed)
+    counts = list(
+        zip(
+            skewed_counts(rng, users, items_per_user, alpha),
+            skewed_counts(rng, users, notices_per_user, alpha),
+            skewed_counts(rng, users, rules_per_user, alpha),
+            strict=True,
+        )
+    )
+    return SeedPlan(
+        seed=seed,
+        domain=domain,
+        # Hashed once: bcrypt per user would dominate the run
+        hashed_password=get_password_hash(password),
+        counts=counts,
+    )
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _timestamp(rng: random.Random) -> datetime:
+    return EPOCH - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+def _user_id(plan: SeedPlan, n: int) -> uuid.UUID:
+    return _uuid(random.Random(f"{plan.seed}:{plan.domain}:user:{n}"))
+
+
+def load_chunk(dsn: str, plan: SeedPlan, start: int, stop: int) -> tuple[int, int]:
+    """
+    COPY users ``start``..``stop`` and everything they own in one
+    transaction, one ``COPY`` per table. Returns (users, rows) loaded.
+
+    Each user's rows come from a generator seeded with the user's number and
+    the table, so a user's data does not depend on how users are chunked.
+    """
+    users = range(start, stop)
+    rows = len(users)
+    with psycopg.connect(dsn) as connection, connection.cursor() as cursor:
+        with cursor.copy(
+            'COPY "user" (id, email, hashed_password, is_active, is_superuser, '
+            "full_name, notify_count, unread_count) FROM STDIN"
+        ) as copy:
+            for n in users:
+                copy.write_row(
+                    (
+                        _user_id(plan, n),
+                        user_email(n, plan.domain),
+                        plan.hashed_password,
+                        True,
+                        False,
+                        f"Seed User {n}",
+                        0,
+                        0,
+                    )
+                )
+        with cursor.copy(
+            "COPY item (id, title, description, owner_id, updated_at) FROM STDIN"
+        ) as copy:
+            for n in users:
+                rng = random.Random(f"{plan.seed}:{plan.domain}:item:{n}")
+                user_id = _user_id(plan, n)
+                for _ in range(plan.counts[n][0]):
+                    copy.write_row(
+                        (
+                            _uuid(rng),
+                            _text(rng, 3),
+                            _text(rng, 12),
+                            user_id,
+                            _timestamp(rng),
+                        )
+                    )
+                rows += plan.counts[n][0]
+        with cursor.copy(
+            "COPY notice (id, title, description, notice_type, read, user_id, "
+            "created_at, updated_at) FROM STDIN"
+        ) as copy:
+            for n in users:
+                rng = random.Random(f"{plan.seed}:{plan.domain}:notice:{n}")
+                user_id = _user_id(plan, n)
+                for _ in range(plan.counts[n][1]):
+                    created_at = _timestamp(rng)
+                    copy.write_row(
+                        (
+                            _uuid(rng),
+                            _text(rng, 4),
+                            _text(rng, 16),
+                            rng.choice(NOTICE_TYPES),
+                            rng.random() < 0.5,
+                            user_id,
+                            created_at,
+                            created_at,
+                        )
+                    )
+                rows += plan.counts[n][1]
+        with cursor.copy(
+            'COPY rule (id, name, owner, "desc", call_no, status, progress, '
+            "owner_id, created_at, updated_at) FROM STDIN"
+        ) as copy:
+            for n in users:
+                rng = random.Random(f"{plan.seed}:{plan.domain}:rule:{n}")
+                user_id = _user_id(plan, n)
+                for _ in range(plan.counts[n][2]):
+                    created_at = _timestamp(rng)
+                    copy.write_row(
+                        (
+                            _uuid(rng),
+                            _text(rng, 2),
+                            f"Seed User {n}",
+                            _text(rng, 10),
+                            rng.randrange(1000),
+                            rng.randrange(4),
+                            rng.randrange(101),
+                            user_id,
+                            created_at,
+                            created_at,
+                        )
+                    )
+                rows += plan.counts[n][2]
+    return len(users), rows
+
+
+def delete_seeded(dsn: str, domain: str) -> None:
+    """
+    Remove users of ``domain`` from an earlier run, with everything they own.
+    """
+    owned = 'SELECT id FROM "user" WHERE email LIKE %s'
+    pattern = f"%@{domain}"
+    with psycopg.connect(dsn) as connection:
+        for table, owner in (
+            ("item", "owner_id"),
+            ("notice", "user_id"),
+            ("rule", "owner_id"),
+        ):
+            connection.execute(
+                f"DELETE FROM {table} WHERE {owner} IN ({owned})", (pattern,)
+            )
+        connection.execute('DELETE FROM "user" WHERE email LIKE %s', (pattern,))
+
+
+def seed_database(
+    plan: SeedPlan, *, workers: int = 4, chunk_size: int = 500, replace: bool = True
+) -> int:
+    """
+    Load ``plan`` with ``workers`` processes. Returns the number of rows.
+    """
+    dsn = database_dsn()
+    if replace:
+        delete_seeded(dsn, plan.domain)
+    users = len(plan.counts)
+    chunks = [
+        (start, min(start + chunk_size, users))
+        for start in range(0, users, chunk_size)
+    ]
+    total = 0
+    if workers <= 1:
+        for start, stop in chunks:
+            total += load_chunk(dsn, plan, start, stop)[1]
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(load_chunk, dsn, plan, start, stop)
+            for start, stop in chunks
+        ]
+        loaded_users = 0
+        for future in futures:
+            chunk_users, rows = future.result()
+            loaded_users += chunk_users
+            total += rows
+            logger.info(f"Loaded {loaded_users}/{users} users ({total} rows)")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--items-per-user", type=float, default=40)
+    parser.add_argument("--notices-per-user", type=float, default=30)
+    parser.add_argument("--rules-per-user", type=float, default=30)
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=1.5,
+        help="Pareto shape of rows per user; smaller means heavier tenants",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-size", type=int, default=500, help="users per chunk")
+    parser.add_argument(
+        "--domain", default=DEFAULT_DOMAIN, help="email domain of seeded users"
+    )
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument(
+        "--keep", action="store_true", help="keep users of --domain from earlier runs"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    plan = make_plan(
+        users=args.users,
+        items_per_user=args.items_per_user,
+        notices_per_user=args.notices_per_user,
+        rules_per_user=args.rules_per_user,
+        alpha=args.alpha,
+        seed=args.seed,
+        domain=args.domain,
+        password=args.password,
+    )
+    heaviest = sorted((sum(counts) for counts in plan.counts), reverse=True)[:5]
+    logger.info(f"Heaviest tenants own {heaviest} rows")
+    rows = seed_database(
+        plan, workers=args.workers, chunk_size=args.chunk_size, replace=not args.keep
+    )
+    elapsed = time.perf_counter() - started
+    logger.info(f"Seeded {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import { createStyles } from 'antd-style';
 import { stringify } from 'querystring';
 import React, { useCallback } from 'react';
 import { flushSync } from 'react-dom';
+import { loginLogout } from '@/services/ant-design-pro/login';
 import HeaderDropdown from '../HeaderDropdown';
 
 export type GlobalHeaderRightProps = {
@@ -41,8 +42,18 @@ export const AvatarDropdown: React.FC<GlobalHeaderRightProps> = ({ menu, childre
    * 退出登录，并且将当前的 url 保存
    */
   const loginOut = async () => {
+    // Revoke the tokens on the server, or the refresh token stays usable
+    // until it expires
+    if (localStorage.getItem('token')) {
+      try {
+        await loginLogout({ skipErrorHandler: true });
+      } catch {
+        // Already expired or revoked: nothing left to revoke
+      }
+    }
     // Remove token from local storage
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
     const { search, pathname } = window.location;
     const urlParams = new URL(window.location.href).searchParams;
     /** 此方法会跳转到 redirect 参数所在的位置 */
@@ -124,6 +124,9 @@ const Login: React.FC = () => {
       if (tokenResponse.access_token) {
         // Store the token in localStorage (using 'token' key to match request interceptor)
         localStorage.setItem('token', tokenResponse.access_token);
+        if (tokenResponse.refresh_token) {
+          localStorage.setItem('refresh_token', tokenResponse.refresh_token);
+        }
 
         const defaultLoginSuccessMessage = intl.formatMessage({
           id: 'pages.login.success',
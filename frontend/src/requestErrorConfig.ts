@@ -1,6 +1,7 @@
 ﻿import type { RequestOptions } from '@@/plugin-request/request';
 import type { RequestConfig } from '@umijs/max';
 import { message, notification } from 'antd';
+import { loginRefreshAccessToken } from '@/services/ant-design-pro/login';
 
 // 错误处理方案： 错误类型
 enum ErrorShowType {
@@ -19,6 +20,60 @@ interface ResponseStructure {
   showType?: ErrorShowType;
 }
 
+// 访问令牌过期前多少秒用 refresh token 换新
+const REFRESH_MARGIN_SECONDS = 60;
+
+// 本标签页进行中的刷新，并发请求共用同一次刷新（refresh token 只能用一次）
+let refreshing: Promise<string | null> | null = null;
+
+const tokenExpiry = (token: string): number => {
+  try {
+    const payload = token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/');
+    return JSON.parse(atob(payload)).exp ?? 0;
+  } catch {
+    return 0;
+  }
+};
+
+const isFresh = (token: string | null): token is string =>
+  !!token && tokenExpiry(token) - Date.now() / 1000 >= REFRESH_MARGIN_SECONDS;
+
+const doRefresh = async (): Promise<string | null> => {
+  // 其他标签页可能刚刚刷新过（localStorage 共享）
+  const current = localStorage.getItem('token');
+  if (isFresh(current)) return current;
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) return null;
+  try {
+    const tokens = await loginRefreshAccessToken(
+      { refresh_token: refreshToken },
+      { skipErrorHandler: true },
+    );
+    localStorage.setItem('token', tokens.access_token);
+    if (tokens.refresh_token) {
+      localStorage.setItem('refresh_token', tokens.refresh_token);
+    }
+    return tokens.access_token;
+  } catch {
+    // 刷新失败时，可能是另一个标签页抢先用掉了同一个 refresh token
+    const latest = localStorage.getItem('token');
+    return isFresh(latest) ? latest : null;
+  }
+};
+
+const refreshAccessToken = (): Promise<string | null> => {
+  if (!refreshing) {
+    // 用 Web Locks 让同一浏览器的各标签页依次刷新
+    const run = navigator.locks
+      ? navigator.locks.request('token-refresh', doRefresh)
+      : doRefresh();
+    refreshing = run.finally(() => {
+      refreshing = null;
+    });
+  }
+  return refreshing;
+};
+
 /**
  * @name 错误处理
  * pro 自带的错误处理， 可以在这里做自己的改动
@@ -75,6 +130,7 @@ export const errorConfig: RequestConfig = {
         if (error.response.status === 401) {
           // 未授权，清除token并跳转到登录页
           localStorage.removeItem('token');
+          localStorage.removeItem('refresh_token');
           sessionStorage.removeItem('token');
           window.location.href = '/user/login';
           return;
@@ -94,9 +150,13 @@ export const errorConfig: RequestConfig = {
 
   // 请求拦截器
   requestInterceptors: [
-    (config: RequestOptions) => {
+    async (config: RequestOptions) => {
       // 添加认证token到请求头
-      const token = localStorage.getItem('token') || sessionStorage.getItem('token');
+      let token = localStorage.getItem('token') || sessionStorage.getItem('token');
+      // 访问令牌快过期时先刷新（登录相关接口除外）
+      if (token && !config.url?.includes('/login/') && !isFresh(token)) {
+        token = (await refreshAccessToken()) || token;
+      }
       if (token) {
         config.headers = {
           ...config.headers,
@@ -104,6 +104,13 @@ declare namespace API {
     access_token: string;
     /** Token Type */
     token_type?: string;
+    /** Refresh Token */
+    refresh_token?: string | null;
+  };
+
+  type TokenRefresh = {
+    /** Refresh Token */
+    refresh_token: string;
   };
 
   type UpdatePassword = {
@@ -17,6 +17,30 @@ export async function loginLoginAccessToken(
   });
 }
 
+/** Refresh Access Token Exchange a refresh token for a new access token and refresh token. Each
+refresh token can be used once; using one again ends the login it came from POST /api/v1/login/refresh-token */
+export async function loginRefreshAccessToken(
+  body: API.TokenRefresh,
+  options?: { [key: string]: any },
+) {
+  return request<API.Token>('/api/v1/login/refresh-token', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    data: body,
+    ...(options || {}),
+  });
+}
+
+/** Logout Revoke the access token of this request, and the refresh token issued with it POST /api/v1/logout */
+export async function loginLogout(options?: { [key: string]: any }) {
+  return request<API.Message>('/api/v1/logout', {
+    method: 'POST',
+    ...(options || {}),
+  });
+}
+
 /** Test Token Test access token POST /api/v1/login/test-token */
 export async function loginTestToken(options?: { [key: string]: any }) {
   return request<API.UserPublic>('/api/v1/login/test-token', {